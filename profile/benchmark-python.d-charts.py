@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Description: cost of SimpleService chart updates with precompiled templates
+#
+# Updates a job with 30 charts of 5 dimensions (like mysql) many times, once with precompiled
+# chart templates (SimpleService.update()) and once building every protocol line with
+# begin()/set()/end() and string concatenation, as python.d did before templates were added.
+# Both produce the same protocol lines, which are discarded.
+#
+# run from netdata source directory with:
+#   python profile/benchmark-python.d-charts.py [ticks]
+# ex.
+#   python profile/benchmark-python.d-charts.py 20000
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python.d", "python_modules"))
+
+import output
+from base import SimpleService
+
+CHARTS_COUNT = 30
+DIMENSIONS = 5
+
+ORDER = ['chart' + str(c) for c in range(CHARTS_COUNT)]
+CHARTS = dict(('chart' + str(c), {
+    'options': [None, 'Chart ' + str(c), 'values/s', 'family', 'benchmark.chart', 'line'],
+    'lines': [['dim_%d_%d' % (c, d), 'dimension ' + str(d), 'incremental'] for d in range(DIMENSIONS)]
+}) for c in range(CHARTS_COUNT))
+
+
+class Service(SimpleService):
+    def __init__(self, configuration=None, name=None):
+        SimpleService.__init__(self, configuration=configuration, name=name)
+        self.order = ORDER
+        self.definitions = CHARTS
+        self.data = dict(('dim_%d_%d' % (c, d), c * 1000 + d) for c in range(CHARTS_COUNT) for d in range(DIMENSIONS))
+
+    def _get_data(self):
+        return self.data
+
+
+class StringService(Service):
+    """
+    Chart updates as done before precompiled templates: every line is formatted by _line(),
+    ids are checked against lists and data stream is a string.
+    """
+
+    def create(self):
+        self._data_stream = ""
+        self._chart_set = False
+        result = Service.create(self)
+        self._charts = list(self._charts)
+        self._dimensions = list(self._dimensions)
+        return result
+
+    def _line(self, instruction, *params):
+        tmp = list(map((lambda x: "''" if x is None or len(x) == 0 else x), params))
+        self._data_stream += "%s %s\n" % (instruction, str(" ".join(tmp)))
+
+    def begin(self, type_id, microseconds=0):
+        if type_id not in self._charts:
+            self.error("wrong chart type_id:", type_id)
+            return False
+        try:
+            int(microseconds)
+        except TypeError:
+            self.error("malformed begin statement: microseconds are not a number:", microseconds)
+            microseconds = ""
+        self._line("BEGIN", type_id, str(microseconds))
+        return True
+
+    def set(self, id, value):
+        if id not in self._dimensions:
+            self.error("wrong dimension id:", id, "Available dimensions are:", *self._dimensions)
+            return False
+        try:
+            value = str(int(value))
+        except TypeError:
+            self.error("cannot set non-numeric value:", value)
+            return False
+        self._line("SET", id, "=", str(value))
+        self._chart_set = True
+        return True
+
+    def end(self):
+        if self._chart_set:
+            self._line("END")
+            self._chart_set = False
+        else:
+            pos = self._data_stream.rfind("BEGIN")
+            self._data_stream = self._data_stream[:pos]
+
+    def commit(self):
+        output.write(self._data_stream + "\n")
+        self._data_stream = ""
+
+    def _update_charts(self, data, interval):
+        updated = False
+        for chart in self.order:
+            if self.begin(self.chart_name + "." + chart, interval):
+                updated = True
+                for dim in self.definitions[chart]['lines']:
+                    try:
+                        self.set(dim[0], data[dim[0]])
+                    except KeyError:
+                        pass
+                self.end()
+        self.commit()
+        return updated
+
+
+def run(service, ticks):
+    """
+    Update job `ticks` times
+    :param service: class
+    :param ticks: int
+    :return: tuple - (microseconds per tick, output of one tick)
+    """
+    job = service(configuration={'update_every': 1, 'priority': 90000, 'retries': 10}, name="benchmark")
+    job.chart_name = "benchmark"
+    job.create()
+    output._multiplexer._buffer = []
+    output._multiplexer._size = 0
+    job.update(1000000)
+    sample = "".join(output._multiplexer._buffer)
+    start = time.time()
+    for _ in range(ticks):
+        job.update(1000000)
+        output.flush()
+    return 1000000 * (time.time() - start) / ticks, sample
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    output._multiplexer.stream = open(os.devnull, "w")
+    print("python %s, %d charts with %d dimensions, %d ticks" % (sys.version.split()[0], CHARTS_COUNT, DIMENSIONS,
+                                                                  ticks))
+    string_time, string_sample = run(StringService, ticks)
+    template_time, template_sample = run(Service, ticks)
+    # old _line() wrote "END " with a trailing space
+    if string_sample.replace("END \n", "END\n") != template_sample:
+        print("outputs differ!")
+    print("%-12s %12s" % ("update", "us per tick"))
+    print("%-12s %12.1f" % ("string", string_time))
+    print("%-12s %12.1f" % ("template", template_time))
+    print("speedup %.1fx" % (string_time / template_time))
+
+
+if __name__ == "__main__":
+    main()
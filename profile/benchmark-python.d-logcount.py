@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Description: apache_cache log counting over raw chunks vs line by line
+#
+# Generates a synthetic mod_cache log (1GB by default) and reads all of it with apache_cache jobs,
+# once counting patterns in raw chunks (LogService._count_raw(), used by apache_cache) and once
+# decoding the log and testing every line, as apache_cache did before.
+# Log is read once before measuring, so both runs read it from page cache.
+#
+# run from netdata source directory with:
+#   python profile/benchmark-python.d-logcount.py [megabytes]
+# ex.
+#   python profile/benchmark-python.d-logcount.py 1024
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+PYTHON_D = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python.d")
+sys.path.insert(0, os.path.join(PYTHON_D, "python_modules"))
+
+# share of lines with every status, rest has no cache status
+STATUSES = [("cache hit", 0.6), ("cache miss", 0.3)]
+
+
+def generate(path, megabytes):
+    """
+    Write synthetic mod_cache log
+    :param path: str
+    :param megabytes: int
+    :return: int - number of lines
+    """
+    random.seed(1)
+    lines = []
+    for i in range(10000):
+        roll = random.random()
+        status = "-"
+        for name, share in STATUSES:
+            if roll < share:
+                status = name
+                break
+            roll -= share
+        lines.append('10.0.%d.%d - - [17/Oct/2016:07:%02d:%02d +0000] "GET /static/%d.css HTTP/1.1" 200 %d %s\n' %
+                     (i // 256 % 256, i % 256, i // 60 % 60, i % 60, random.randint(0, 100000),
+                      random.randint(100, 100000), status))
+    block = "".join(lines).encode()
+    count = 0
+    with open(path, "wb") as log:
+        while log.tell() < megabytes * 1048576:
+            log.write(block)
+            count += len(lines)
+    return count
+
+
+def load_apache_cache():
+    """
+    :return: class - Service of apache_cache module
+    """
+    path = os.path.join(PYTHON_D, "apache_cache.chart.py")
+    try:
+        import importlib.machinery
+        return importlib.machinery.SourceFileLoader("apache_cache", path).load_module().Service
+    except ImportError:
+        import imp
+        return imp.load_source("apache_cache", path).Service
+
+
+def line_service(service):
+    """
+    :param service: class - Service of apache_cache module
+    :return: class - the same module counting decoded lines
+    """
+    class LineService(service):
+        def _get_data(self):
+            hit = 0
+            miss = 0
+            other = 0
+            for line in self._get_lines():
+                if "cache hit" in line:
+                    hit += 1
+                elif "cache miss" in line:
+                    miss += 1
+                else:
+                    other += 1
+            return {'hit': hit,
+                    'miss': miss,
+                    'other': other}
+    return LineService
+
+
+def read(service, path):
+    """
+    Read whole log with a new job
+    :param service: class
+    :param path: str
+    :return: tuple - (seconds, counts)
+    """
+    job = service(configuration={'update_every': 1, 'priority': 60000, 'retries': 10, 'path': path,
+                                 'checkpoint': False}, name=None)
+    job.check()
+    totals = {'hit': 0, 'miss': 0, 'other': 0}
+    start = time.time()
+    while True:
+        data = job._get_data()
+        if sum(data.values()) == 0:
+            break
+        for key in totals:
+            totals[key] += data[key]
+    return time.time() - start, totals
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "cache.log")
+    try:
+        lines = generate(path, megabytes)
+        size = os.path.getsize(path) / 1048576.0
+        service = load_apache_cache()
+        read(service, path)
+        print("python %s, %.0fMB log, %d lines" % (sys.version.split()[0], size, lines))
+        print("%-6s %10s %10s %14s" % ("count", "seconds", "MB/s", "lines/s"))
+        results = []
+        for name, counting in (("raw", service), ("lines", line_service(service))):
+            seconds, totals = read(counting, path)
+            results.append(totals)
+            print("%-6s %10.2f %10.1f %14.0f" % (name, seconds, size / seconds, lines / seconds))
+        if results[0] != results[1] or sum(results[0].values()) != lines:
+            print("counts differ!", results)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Description: latency of redis python.d module over TCP loopback and unix socket
+#
+# Starts a minimal redis-like server answering the redis module's pipeline with canned
+# replies (about 4KB of INFO) on both 127.0.0.1 and a unix stream socket, then collects
+# data with redis module jobs connected to both, back to back, as fast as possible.
+# Server is the same process for both jobs, so only the transport differs.
+#
+# run from netdata source directory with:
+#   python profile/benchmark-python.d-sockets.py [requests]
+# ex.
+#   python profile/benchmark-python.d-sockets.py 20000
+
+import os
+import sys
+import time
+import socket
+import select
+import tempfile
+import subprocess
+
+PYTHON_D = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python.d")
+sys.path.insert(0, os.path.join(PYTHON_D, "python_modules"))
+
+# collection is done in this many rounds, jobs take turns
+ROUNDS = 20
+
+SECTION = "".join("%s_%d:%d\r\n" % (name, i, i * 1000)
+                  for i in range(10) for name in ("connected", "used_memory", "keyspace"))
+REPLIES = {
+    'INFO': "$%d\r\n%s\r\n" % (len(SECTION), SECTION),
+    'CONFIG': "*2\r\n$9\r\nmaxmemory\r\n$7\r\n1048576\r\n",
+    'SLOWLOG': ":3\r\n",
+    'DBSIZE': ":10\r\n",
+    'LATENCY': "*0\r\n"
+}
+
+
+def commands(buffer):
+    """
+    Split complete RESP arrays from the start of buffer
+    :param buffer: bytes
+    :return: tuple - (list of command names, rest of buffer)
+    """
+    names = []
+    while buffer.startswith(b"*"):
+        lines = buffer.split(b"\r\n")
+        count = int(lines[0][1:])
+        if len(lines) < 2 * count + 2:
+            break
+        names.append(lines[2].decode().upper())
+        buffer = b"\r\n".join(lines[2 * count + 1:])
+    return names, buffer
+
+
+def serve(port, path):
+    """
+    Single threaded server answering on TCP port and unix socket
+    :param port: int
+    :param path: str
+    """
+    listeners = []
+    for family, address in ((socket.AF_INET, ("127.0.0.1", port)), (socket.AF_UNIX, path)):
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(address)
+        listener.listen(16)
+        listeners.append(listener)
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+    buffers = {}
+    while True:
+        for sock in select.select(listeners + list(buffers), [], [])[0]:
+            if sock in listeners:
+                buffers[sock.accept()[0]] = b""
+                continue
+            data = sock.recv(65536)
+            if not data:
+                sock.close()
+                del buffers[sock]
+                continue
+            names, buffers[sock] = commands(buffers[sock] + data)
+            sock.sendall("".join(REPLIES.get(name, "-ERR unknown command\r\n") for name in names).encode())
+
+
+def load_redis():
+    """
+    :return: class - Service of redis module
+    """
+    path = os.path.join(PYTHON_D, "redis.chart.py")
+    try:
+        import importlib.machinery
+        return importlib.machinery.SourceFileLoader("redis", path).load_module().Service
+    except ImportError:
+        import imp
+        return imp.load_source("redis", path).Service
+
+
+def create(service, name, configuration):
+    """
+    Create and check redis job
+    :param service: class
+    :param name: str
+    :param configuration: dict
+    :return: object
+    """
+    configuration.update({'update_every': 1, 'priority': 60000, 'retries': 10})
+    job = service(configuration=configuration, name=name)
+    job.chart_name = "redis_" + name
+    if not job.check():
+        raise RuntimeError(name + " check failed")
+    return job
+
+
+def collect(job, count, results):
+    """
+    Collect data count times, adding round trip time, whole collection time and CPU time to results
+    :param job: object
+    :param count: int
+    :param results: dict
+    """
+    start = os.times()
+    for _ in range(count):
+        t_start = time.time()
+        if job._get_data() is None:
+            raise RuntimeError(job.name + " collection failed")
+        results['total'].append(time.time() - t_start)
+        results['round_trip'].append(job.round_trip)
+    end = os.times()
+    results['cpu'] += (end[0] - start[0]) + (end[1] - start[1])
+
+
+def report(name, results):
+    """
+    :param name: str
+    :param results: dict
+    """
+    count = len(results['total'])
+    round_trip = sorted(results['round_trip'])
+    print("%-6s %8d %10.1f %10.1f %10.1f %10.1f %12.1f" % (
+        name, count, 1000000 * sum(round_trip) / count, 1000000 * round_trip[count // 2],
+        1000000 * round_trip[int(count * 0.99)], 1000000 * sum(results['total']) / count,
+        1000000 * results['cpu'] / count))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]), sys.argv[3])
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "redis.sock")
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port), path],
+                              stdout=subprocess.PIPE)
+    try:
+        server.stdout.readline()
+        service = load_redis()
+        jobs = [create(service, "tcp", {'host': "127.0.0.1", 'port': port, 'dns_ttl': 60}),
+                create(service, "unix", {'socket': path})]
+        results = [{'total': [], 'round_trip': [], 'cpu': 0.0} for _ in jobs]
+        # jobs take turns, so both are equally affected by other load on the machine
+        for _ in range(ROUNDS):
+            for job, result in zip(jobs, results):
+                collect(job, count // ROUNDS, result)
+        print("python %s, %d requests per job" % (sys.version.split()[0], count))
+        print("%-6s %8s %10s %10s %10s %10s %12s" % ("job", "requests", "rtt avg", "rtt p50", "rtt p99",
+                                                    "update avg", "cpu/update"))
+        for job, result in zip(jobs, results):
+            report(job.name, result)
+        print("(microseconds, rtt: request sent to whole response received, update: whole _get_data())")
+    finally:
+        server.kill()
+        server.wait()
+        os.unlink(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
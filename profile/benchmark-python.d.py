@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Description: CPU and memory usage of python.d.plugin job runners
+#
+# Compares running N dummy jobs (every one collecting 10 values every second)
+# with one thread per job ('threads' mode) and from the event loop scheduler ('scheduler' mode).
+# Every run is done in a new process, protocol output is discarded.
+#
+# run from netdata source directory with:
+#   python profile/benchmark-python.d.py [seconds] [jobs ...]
+# ex.
+#   python profile/benchmark-python.d.py 30 10 100 1000
+
+import os
+import sys
+import time
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python.d", "python_modules"))
+
+import output
+from base import SimpleService
+from scheduler import Scheduler
+
+# matching python.d.plugin defaults
+WORKERS = 4
+TICK = 0.1
+# jobs are started this many seconds before measurement starts
+WARMUP = 3
+
+ORDER = ['values']
+CHARTS = {
+    'values': {
+        'options': [None, 'Dummy values', 'values', 'dummy', 'dummy.values', 'line'],
+        'lines': [['value' + str(i), None, 'absolute'] for i in range(10)]
+    }
+}
+
+
+class Service(SimpleService):
+    def __init__(self, configuration=None, name=None):
+        SimpleService.__init__(self, configuration=configuration, name=name)
+        self.order = ORDER
+        self.definitions = CHARTS
+        self._value = 0
+
+    def _get_data(self):
+        self._value += 1
+        return dict(('value' + str(i), self._value + i) for i in range(10))
+
+
+def rss():
+    """
+    Resident memory of this process
+    :return: int - kilobytes
+    """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(mode, count, seconds):
+    """
+    Run jobs and print CPU time (in seconds) and RSS (in kilobytes) used while running them
+    :param mode: str
+    :param count: int
+    :param seconds: int
+    """
+    output._multiplexer.stream = open(os.devnull, "w")
+    jobs = []
+    for i in range(count):
+        job = Service(configuration={'update_every': 1, 'priority': 90000, 'retries': 10}, name=str(i))
+        job.chart_name = "dummy_" + str(i)
+        job.check()
+        job.create()
+        jobs.append(job)
+
+    if mode == "scheduler":
+        scheduler = Scheduler(WORKERS, False, output.flush, TICK)
+        for job in jobs:
+            scheduler.add(job)
+        loop = threading.Thread(target=scheduler.run)
+        loop.daemon = True
+        loop.start()
+    else:
+        for job in jobs:
+            job.start()
+
+        def flush():
+            while True:
+                output.flush()
+                time.sleep(TICK)
+        loop = threading.Thread(target=flush)
+        loop.daemon = True
+        loop.start()
+
+    time.sleep(WARMUP)
+    start = os.times()
+    time.sleep(seconds)
+    end = os.times()
+    cpu = (end[0] - start[0]) + (end[1] - start[1])
+    sys.stderr.write("%s %d %.3f %d %d\n" % (mode, count, cpu, rss(), threading.active_count()))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        measure(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    counts = [int(count) for count in sys.argv[2:]] or [10, 100, 1000]
+    print("python %s, %d seconds per run" % (sys.version.split()[0], seconds))
+    print("%-10s %6s %10s %8s %10s %8s" % ("mode", "jobs", "cpu (s)", "cpu (%)", "rss (MB)", "threads"))
+    for count in counts:
+        for mode in ("threads", "scheduler"):
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run", mode, str(count),
+                                        str(seconds)], stderr=subprocess.PIPE)
+            # python2 can complain about daemon threads at exit, result is the line starting with mode
+            result = [line.split() for line in process.communicate()[1].decode().splitlines()
+                      if line.startswith(mode + " ")][-1]
+            cpu = float(result[2])
+            print("%-10s %6d %10.2f %8.1f %10.1f %8s" % (mode, count, cpu, 100.0 * cpu / seconds,
+                                                        int(result[3]) / 1024.0, result[4]))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ priority = 60000
 retries = 60
 # update_every = 3
 
+# searched in raw log data, every line contains at most one of them
+PATTERNS = [b"cache hit", b"cache miss"]
+
 ORDER = ['cache']
 CHARTS = {
     'cache': {
@@ -30,27 +33,11 @@ class Service(LogService):
 
     def _get_data(self):
         """
-        Parse new log lines
+        Count new log lines
         :return: dict
         """
-        try:
-            raw = self._get_raw_data()
-            if raw is None:
-                return None
-        except (ValueError, AttributeError):
-            return None
-
-        hit = 0
-        miss = 0
-        other = 0
-        for line in raw:
-            if "cache hit" in line:
-                hit += 1
-            elif "cache miss" in line:
-                miss += 1
-            else:
-                other += 1
+        (hit, miss), lines = self._count_raw(PATTERNS)
 
         return {'hit': hit,
                 'miss': miss,
-                'other': other}
+                'other': lines - hit - miss}
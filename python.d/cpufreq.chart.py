@@ -3,19 +3,22 @@
 # Author: Pawel Krupa (paulfantom)
 
 import os
+import time
 from base import SimpleService
 
 # default module values (can be overridden per job in `config`)
 # update_every = 2
 
+# how often (in seconds) cpus are searched for, to find the ones brought online
+RESCAN_EVERY = 60
+
 ORDER = ['cpufreq']
 
 CHARTS = {
     'cpufreq': {
         'options': [None, 'CPU Clock', 'MHz', 'cpufreq', None, 'line'],
-        'lines': [
-            # lines are created dynamically in `check()` method
-        ]}
+        'lines': [],
+        'dynamic': {'match': r'^cpu\d+$', 'divisor': 1000}}
 }
 
 
@@ -32,15 +35,34 @@ class Service(SimpleService):
         self._orig_name = ""
         self.assignment = {}
         self.paths = []
+        self._next_scan = 0
+
+    def _scan(self):
+        """
+        Find frequency files of all cpus. Newly found cpus get next free numbers.
+        """
+        paths = []
+        for dirpath, _, filenames in os.walk(self.sys_dir):
+            if self.filename in filenames:
+                paths.append(dirpath + "/" + self.filename)
+        paths.sort()
+        for path in paths:
+            if path not in self.assignment:
+                self.assignment[path] = "cpu" + str(len(self.assignment))
+        self.paths = paths
+        self._next_scan = time.time() + RESCAN_EVERY
 
     def _get_data(self):
-        raw = {}
-        for path in self.paths:
-            with open(path, 'r') as f:
-                raw[path] = f.read()
+        if time.time() >= self._next_scan:
+            self._scan()
         data = {}
         for path in self.paths:
-            data[self.assignment[path]] = raw[path]
+            try:
+                with open(path, 'r') as f:
+                    data[self.assignment[path]] = f.read()
+            except (IOError, OSError):
+                # cpu went offline
+                pass
         return data
 
     def check(self):
@@ -51,24 +73,11 @@ class Service(SimpleService):
 
         self._orig_name = self.chart_name
 
-        for dirpath, _, filenames in os.walk(self.sys_dir):
-            if self.filename in filenames:
-                self.paths.append(dirpath + "/" + self.filename)
-
+        self._scan()
         if len(self.paths) == 0:
             self.error("cannot find", self.filename)
             return False
 
-        self.paths.sort()
-        i = 0
-        for path in self.paths:
-            self.assignment[path] = "cpu" + str(i)
-            i += 1
-
-        for name in self.assignment:
-            dim = self.assignment[name]
-            self.definitions[ORDER[0]]['lines'].append([dim, dim, 'absolute', 1, 1000])
-
         return True
 
     def create(self):
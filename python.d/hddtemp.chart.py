@@ -4,6 +4,7 @@
 
 import os
 from base import SocketService
+from framing import TerminatorFramer
 
 # default module values (can be overridden per job in `config`)
 #update_every = 2
@@ -24,9 +25,9 @@ ORDER = ['temperatures']
 CHARTS = {
     'temperatures': {
         'options': ['disks_temp', 'temperature', 'Celsius', 'Disks temperature', 'hddtemp.temp', 'line'],
-        'lines': [
-            # lines are created dynamically in `check()` method
-        ]}
+        'lines': [],
+        # every disk reported by hddtemp
+        'dynamic': {'match': r'.+'}}
 }
 
 
@@ -40,6 +41,8 @@ class Service(SocketService):
         self.order = ORDER
         self.definitions = CHARTS
         self.disk_count = 1
+        # hddtemp sends 5 fields per disk, every one ended with '|'
+        self._framer = TerminatorFramer(b"|", 5)
         self.exclude = []
 
     def _get_disk_count(self):
@@ -51,21 +54,13 @@ class Service(SocketService):
                 self.debug("Disk not found")
         return len(all_disks)
 
-    def _check_raw_data(self, data):
-        if not data.endswith('|'):
-            return False
-
-        if data.count('|') % (5 * self.disk_count) == 0:
-            return True
-
-        return False
-
     def _get_data(self):
         """
         Get data from TCP/IP socket
         :return: dict
         """
         self.disk_count = self._get_disk_count()
+        self._framer.multiple = max(5 * self.disk_count, 1)
         try:
             raw = self._get_raw_data().split("|")[:-1]
         except AttributeError:
@@ -87,7 +82,7 @@ class Service(SocketService):
 
     def check(self):
         """
-        Parse configuration, check if hddtemp is available, and dynamically create chart lines data
+        Parse configuration and check if hddtemp is available
         :return: boolean
         """
         self._parse_config()
@@ -96,13 +91,9 @@ class Service(SocketService):
         except (KeyError, TypeError) as e:
             self.info("No excluded disks")
             self.debug(str(e))
-        data = self._get_data()
-        if data is None:
+        if self._get_data() is None:
             return False
 
-        for name in data:
-            self.definitions[ORDER[0]]['lines'].append([name])
-
         return True
 
 
@@ -2,18 +2,28 @@
 # Description: MySQL netdata python.d module
 # Author: Pawel Krupa (paulfantom)
 
+import re
+import time
+import threading
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 from base import SimpleService
 import msg
 
 # import 3rd party library to handle MySQL communication
 try:
     import MySQLdb
+    from MySQLdb.constants import CLIENT
 
     # https://github.com/PyMySQL/mysqlclient-python
     msg.info("using MySQLdb")
 except ImportError:
     try:
         import pymysql as MySQLdb
+        from pymysql.constants import CLIENT
 
         # https://github.com/PyMySQL/PyMySQL
         msg.info("using pymysql")
@@ -32,14 +42,70 @@ retries = 60
 #         'user': 'root',
 #         'pass': '',
 #         'socket': '/var/run/mysqld/mysqld.sock',
+#         'digests_top': 10,
+#         'digests_max': 5000,
+#         'servers': [{'name': 'shard1', 'host': 'shard1.example.org'}],
+#         'concurrency': 8,
+#         'timeout': update_every,
 #         'update_every': update_every,
 #         'retries': retries,
 #         'priority': priority
 #     }
 #}
 
-# query executed on MySQL server
-QUERY = "SHOW GLOBAL STATUS"
+# queries executed on MySQL server in one batch
+# (SHOW GLOBAL STATUS is filtered to variables used by charts, see _build_queries)
+QUERY_STATUS = "SHOW GLOBAL STATUS WHERE Variable_name IN ({0})"
+QUERY_SLAVE = "SHOW SLAVE STATUS"
+# server's own threads (event scheduler, replication) run as long as the server and aren't counted
+QUERY_PROCESSLIST = "SELECT SUM(COMMAND != 'Sleep'), SUM(COMMAND = 'Sleep'), MAX(IF(COMMAND != 'Sleep', TIME, 0)) " \
+                    "FROM information_schema.PROCESSLIST " \
+                    "WHERE COMMAND NOT IN ('Daemon', 'Binlog Dump', 'Binlog Dump GTID') AND USER <> 'system user'"
+QUERY_VARIABLES = "SHOW GLOBAL VARIABLES WHERE Variable_name IN ({0})"
+# only digests executed since previous update are fetched
+QUERY_DIGESTS = "SELECT DIGEST, LEFT(DIGEST_TEXT, 64), COUNT_STAR, SUM_TIMER_WAIT, LAST_SEEN " \
+                "FROM performance_schema.events_statements_summary_by_digest " \
+                "WHERE LAST_SEEN >= '{0}' ORDER BY LAST_SEEN DESC LIMIT {1}"
+
+# global variables used by charts, they change rarely so they are refreshed every VARIABLES_EVERY seconds
+VARIABLES = ['max_connections']
+VARIABLES_EVERY = 600
+
+# values which don't come from SHOW GLOBAL STATUS
+SLAVE_STATUS = ['Seconds_Behind_Master', 'Slave_IO_Running', 'Slave_SQL_Running']
+PROCESSLIST = ['processlist_active', 'processlist_sleeping', 'processlist_longest']
+COLLECTOR = ['collector_connects', 'collector_connect_time']
+DIGESTS = ['digest_other']
+CALCULATED = {'Thread_cache_misses': ['Threads_created', 'Connections']}
+
+# number of statement digests charted by time, the rest is added to "other"
+DIGESTS_TOP = 10
+# maximum number of digests whose previous counters are kept, least recently seen are evicted
+DIGESTS_MAX = 5000
+# charted digest is replaced only by a digest taking DIGESTS_HYSTERESIS times more time than its smoothed time,
+# so dimensions don't flap; charted digests not executed for DIGESTS_IDLE seconds are dropped
+DIGESTS_HYSTERESIS = 1.5
+DIGESTS_SMOOTHING = 0.8
+DIGESTS_IDLE = 300
+DIGEST_NAME = re.compile(r"[^\w()*?=<>,.+-]+")
+
+# number of servers of one job queried at the same time
+CONCURRENCY = 8
+# options of a job used by all its servers, unless a server sets them
+SERVER_DEFAULTS = ['user', 'pass', 'session', 'digests_top', 'digests_max', 'timeout']
+SERVER_NAME = re.compile(r"\W+")
+
+# connection isn't dropped by server when it is idle between updates
+SESSION = "SET SESSION wait_timeout = {0}"
+
+# connection idle for more than PING_AFTER seconds is checked before use
+PING_AFTER = 60
+
+# maximum delay (in seconds) between attempts to connect
+MAX_BACKOFF = 300
+
+# client errors meaning that connection is lost: CR_SERVER_GONE_ERROR, CR_SERVER_LOST, CR_SERVER_LOST_EXTENDED
+CONNECTION_LOST = (2006, 2013, 2055)
 
 ORDER = ['net',
          'queries',
@@ -47,7 +113,7 @@ ORDER = ['net',
          'table_locks',
          'join_issues', 'sort_issues',
          'tmp',
-         'connections', 'connection_errors',
+         'connections', 'connections_active', 'connection_errors',
          'binlog_cache', 'binlog_stmt_cache',
          'threads', 'thread_cache_misses',
          'innodb_io', 'innodb_io_ops', 'innodb_io_pending_ops', 'innodb_log', 'innodb_os_log', 'innodb_os_log_io',
@@ -55,7 +121,10 @@ ORDER = ['net',
          'innodb_buffer_pool_read_ahead', 'innodb_buffer_pool_reqs', 'innodb_buffer_pool_ops',
          'qcache_ops', 'qcache', 'qcache_freemem', 'qcache_memblocks',
          'key_blocks', 'key_requests', 'key_disk_ops',
-         'files', 'files_rate']
+         'files', 'files_rate',
+         'processlist', 'processlist_longest', 'digests',
+         'slave_behind', 'slave_status',
+         'collector_connects', 'collector_connect_time']
 
 CHARTS = {
     'net': {
@@ -124,6 +193,13 @@ CHARTS = {
             ["Connections", "all", "incremental"],
             ["Aborted_connects", "aborted", "incremental"]
         ]},
+    'connections_active': {
+        'options': [None, 'mysql Active Connections', 'connections', 'connections', 'mysql.connections_active', 'line'],
+        'lines': [
+            ["Threads_connected", "active", "absolute"],
+            ["Max_used_connections", "max_active", "absolute"],
+            ["max_connections", "limit", "absolute"]
+        ]},
     'binlog_cache': {
         'options': [None, 'mysql Binlog Cache', 'transactions/s', 'binlog', 'mysql.binlog_cache', 'line'],
         'lines': [
@@ -298,51 +374,186 @@ CHARTS = {
             ["Connection_errors_peer_address", "peer_addr", "incremental"],
             ["Connection_errors_select", "select", "incremental"],
             ["Connection_errors_tcpwrap", "tcpwrap", "incremental"]
+        ]},
+    'processlist': {
+        'options': [None, 'mysql Processes', 'processes', 'threads', 'mysql.processlist', 'stacked'],
+        'lines': [
+            ["processlist_active", "active", "absolute"],
+            ["processlist_sleeping", "sleeping", "absolute"]
+        ]},
+    'processlist_longest': {
+        'options': [None, 'mysql Longest Running Statement', 'seconds', 'threads', 'mysql.processlist_longest',
+                    'line'],
+        'lines': [
+            ["processlist_longest", "time", "absolute"]
+        ]},
+    'digests': {
+        'options': [None, 'mysql Top Statements by Time', 'milliseconds/s', 'statements', 'mysql.digests',
+                    'stacked'],
+        'lines': [
+            ["digest_other", "other", "absolute", 1, 1000]
+        ],
+        'dynamic': {'match': r'^digest_([0-9a-f]+)$', 'names': 'digest_names', 'divisor': 1000}},
+    'slave_behind': {
+        'options': [None, 'mysql Slave Behind Seconds', 'seconds', 'slave', 'mysql.slave_behind', 'line'],
+        'lines': [
+            ["Seconds_Behind_Master", "seconds", "absolute"]
+        ]},
+    'slave_status': {
+        'options': [None, 'mysql Slave Status', 'status', 'slave', 'mysql.slave_status', 'line'],
+        'lines': [
+            ["Slave_SQL_Running", "sql_running", "absolute"],
+            ["Slave_IO_Running", "io_running", "absolute"]
+        ]},
+    'collector_connects': {
+        'options': [None, 'mysql Connections Made by Netdata', 'connections/s', 'collector', 'mysql.collector_connects',
+                    'line'],
+        'lines': [
+            ["collector_connects", "connects", "incremental"]
+        ]},
+    'collector_connect_time': {
+        'options': [None, 'mysql Last Connection Time of Netdata', 'milliseconds', 'collector',
+                    'mysql.collector_connect_time', 'line'],
+        'lines': [
+            ["collector_connect_time", "time", "absolute", 1, 1000]
         ]}
 
 }
 
 
-class Service(SimpleService):
-    def __init__(self, configuration=None, name=None):
-        SimpleService.__init__(self, configuration=configuration, name=name)
-        self._parse_config(configuration)
-        self.order = ORDER
-        self.definitions = CHARTS
-        self.connection = None
+def _connection_options(configuration):
+    """
+    Get options of connection to MySQL server. my.cnf takes precedence over socket and socket over host.
+    :param configuration: dict
+    :return: dict
+    """
+    options = {'user': configuration.get('user', 'root'),
+               'pass': configuration.get('pass', ''),
+               'my.cnf': '',
+               'socket': '',
+               'host': '',
+               'port': 0}
+    if 'my.cnf' in configuration:
+        options['my.cnf'] = configuration['my.cnf']
+    elif 'socket' in configuration:
+        options['socket'] = configuration['socket']
+    elif 'host' in configuration:
+        options['host'] = configuration['host']
+        options['port'] = int(configuration.get('port', 3306))
+    return options
+
+
+def _build_queries():
+    """
+    Prepare batch of queries. Only status variables needed by charts are requested.
+    :return: list
+    """
+    names = set()
+    for chart in ORDER:
+        for line in CHARTS[chart]['lines']:
+            names.add(line[0])
+    for name, needed in CALCULATED.items():
+        if name in names:
+            names.update(needed)
+    names.difference_update(VARIABLES + SLAVE_STATUS + PROCESSLIST + COLLECTOR + DIGESTS + list(CALCULATED))
+    return [('status', QUERY_STATUS.format(", ".join("'" + name + "'" for name in sorted(names)))),
+            ('slave', QUERY_SLAVE),
+            ('processlist', QUERY_PROCESSLIST)]
+
+
+def _server_charts(server):
+    """
+    Copy of standard charts for one server of multi-server job.
+    Charts and data keys are prefixed with server name and charts are grouped by server.
+    :param server: str
+    :return: tuple - (order, definitions)
+    """
+    prefix = server + "_"
+    order = []
+    definitions = {}
+    for chart in ORDER:
+        definition = CHARTS[chart]
+        options = list(definition['options'])
+        options[1] += " (" + server + ")"
+        options[3] = server
+        charts = {'options': options,
+                  'lines': [[prefix + line[0]] + list(line[1:]) for line in definition['lines']]}
+        if 'dynamic' in definition:
+            rule = dict(definition['dynamic'])
+            rule['match'] = "^" + re.escape(prefix) + rule['match'].lstrip("^")
+            if 'names' in rule:
+                rule['names'] = prefix + rule['names']
+            charts['dynamic'] = rule
+        order.append(prefix + chart)
+        definitions[prefix + chart] = charts
+    return order, definitions
 
-    def _parse_config(self, configuration):
+
+class Server(object):
+    """
+    Persistent connection to one MySQL server and state of data collection from it.
+    """
+
+    def __init__(self, service, configuration, name=None):
         """
-        Parse configuration to collect data from MySQL server
+        :param service: Service
         :param configuration: dict
-        :return: dict
+        :param name: str - set for servers of multi-server job
         """
-        if self.name is None:
-            self.name = 'local'
-        if 'user' not in configuration:
-            self.configuration['user'] = 'root'
-        if 'pass' not in configuration:
-            self.configuration['pass'] = ''
-        if 'my.cnf' in configuration:
-            self.configuration['socket'] = ''
-            self.configuration['host'] = ''
-            self.configuration['port'] = 0
-        elif 'socket' in configuration:
-            self.configuration['my.cnf'] = ''
-            self.configuration['host'] = ''
-            self.configuration['port'] = 0
-        elif 'host' in configuration:
-            self.configuration['my.cnf'] = ''
-            self.configuration['socket'] = ''
-            if 'port' in configuration:
-                self.configuration['port'] = int(configuration['port'])
-            else:
-                self.configuration['port'] = 3306
-
-    def _connect(self):
+        self.service = service
+        self.name = name
+        self.configuration = _connection_options(configuration)
+        self.timeout = service.update_every
+        self.connection = None
+        # [(name, query)] executed in one batch, statements which failed are skipped
+        self.queries = []
+        self._disabled = set()
+        self._variables = {}
+        self._next_variables = 0
+        # statements executed once for every new connection
+        try:
+            self.session = list(configuration['session'])
+        except (KeyError, TypeError):
+            self.session = [SESSION.format(max(service.update_every * 10, 60))]
+        # connection statistics and reconnect backoff
+        self.connects = 0
+        self.connect_time = 0
+        self._backoff = 0
+        self._next_connect = 0
+        self._last_used = 0
+        # digest: [count, time] cumulative counters seen last time, ordered from least recently seen
+        self.digests_top = DIGESTS_TOP
+        self.digests_max = DIGESTS_MAX
+        self._digests = OrderedDict()
+        # charted digest: [smoothed time per second, last time it was executed]
+        self._digests_charted = {}
+        self._digests_seen = '1970-01-01 00:00:00'
+        self._digests_time = None
+        for option in ('digests_top', 'digests_max', 'timeout'):
+            try:
+                setattr(self, option, int(configuration[option]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        # set while server is queried by worker thread
+        self.busy = False
+
+    def error(self, *params):
+        if self.name is not None:
+            params = (self.name + ":",) + params
+        self.service.error(*params)
+
+    def debug(self, *params):
+        if self.name is not None:
+            params = (self.name + ":",) + params
+        self.service.debug(*params)
+
+    def connect(self):
         """
-        Try to connect to MySQL server
+        Connect to MySQL server and prepare session.
+        After failure next attempt should be made after exponentially growing delay (see get_data).
+        :return: boolean
         """
+        t_start = time.time()
         try:
             self.connection = MySQLdb.connect(user=self.configuration['user'],
                                               passwd=self.configuration['pass'],
@@ -350,46 +561,343 @@ class Service(SimpleService):
                                               unix_socket=self.configuration['socket'],
                                               host=self.configuration['host'],
                                               port=self.configuration['port'],
-                                              connect_timeout=self.update_every)
+                                              connect_timeout=self.timeout,
+                                              client_flag=CLIENT.MULTI_STATEMENTS)
         except Exception as e:
-            self.error("problem connecting to server:", e)
-            raise RuntimeError
+            self.error("problem connecting to server:", str(e))
+            self.connection = None
+            self._backoff = min(max(self._backoff * 2, self.service.update_every), MAX_BACKOFF)
+            self._next_connect = time.time() + self._backoff
+            return False
+        self.connect_time = time.time() - t_start
+        self.connects += 1
+        self._backoff = 0
+        self._last_used = time.time()
 
-    def _get_data(self):
+        cursor = self.connection.cursor()
+        for statement in self.session:
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                self.error("cannot set up session with '" + statement + "'.", str(e))
+        cursor.close()
+        return True
+
+    def disconnect(self):
         """
-        Get raw data from MySQL server
+        Close connection to MySQL server
+        """
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+
+    def _keepalive(self):
+        """
+        Ping server if connection wasn't used for a long time, so broken connection isn't used for queries
+        """
+        if time.time() - self._last_used < PING_AFTER:
+            return
+        try:
+            self.connection.ping()
+            self._last_used = time.time()
+        except Exception as e:
+            self.debug("connection is broken:", str(e))
+            self.disconnect()
+
+    def _parse_digests(self, rows, data):
+        """
+        Calculate time spent in every digest since previous update from cumulative counters.
+        Digests taking the most time are charted (up to `digests_top`), others are summed as "other".
+        Charted digests are ranked again every update (see DIGESTS_HYSTERESIS), values of dropped ones
+        aren't sent anymore.
+        :param rows: list
+        :param data: dict
+        """
+        now = time.time()
+        interval = now - self._digests_time if self._digests_time is not None else None
+        self._digests_time = now
+        deltas = {}
+        names = {}
+        for digest, text, count, timer, seen in rows:
+            if seen is not None and str(seen) > self._digests_seen:
+                self._digests_seen = str(seen)
+            previous = self._digests.pop(digest, None)
+            self._digests[digest] = (int(count), int(timer))
+            if previous is None or int(timer) < previous[1]:
+                # new (or evicted before) digest or counters were truncated
+                continue
+            if int(count) > previous[0]:
+                deltas[digest] = int(timer) - previous[1]
+                names[digest] = text
+        while len(self._digests) > self.digests_max:
+            self._digests.popitem(last=False)
+        if interval is None or interval <= 0:
+            # nothing to compare with yet
+            data['digest_other'] = 0
+            return
+
+        # picoseconds to microseconds per second
+        scale = 1000000.0 * interval
+        rates = dict((digest, delta / scale) for digest, delta in deltas.items())
+        charted = self._digests_charted
+        for digest, score in list(charted.items()):
+            rate = rates.get(digest, 0)
+            score[0] = score[0] * DIGESTS_SMOOTHING + rate * (1 - DIGESTS_SMOOTHING)
+            if rate > 0:
+                score[1] = now
+            elif now - score[1] > DIGESTS_IDLE:
+                del charted[digest]
+        weakest = sorted(charted, key=lambda d: charted[d][0])
+        for digest in sorted(rates, key=rates.get, reverse=True):
+            if digest is None or digest in charted:
+                continue
+            if len(charted) >= self.digests_top:
+                if len(weakest) == 0 or rates[digest] <= charted[weakest[0]][0] * DIGESTS_HYSTERESIS:
+                    break
+                del charted[weakest.pop(0)]
+            charted[digest] = [rates[digest], now]
+
+        other = 0
+        for digest, rate in rates.items():
+            if digest not in charted:
+                other += rate
+        for digest in charted:
+            data['digest_' + digest] = int(rates.get(digest, 0))
+        data['digest_other'] = int(other)
+        data['digest_names'] = dict(('digest_' + digest, DIGEST_NAME.sub(' ', names[digest] or digest).strip()[:40])
+                                    for digest in charted if digest in names)
+
+    def _parse_result(self, name, cursor, data):
+        """
+        Add values from result of one query to data
+        :param name: str
+        :param cursor: Cursor
+        :param data: dict
+        """
+        rows = cursor.fetchall()
+        if name in ('status', 'variables'):
+            data.update(rows)
+        elif name == 'slave':
+            if len(rows) == 0:
+                # not a slave
+                return
+            slave = dict(zip([column[0] for column in cursor.description], rows[0]))
+            if slave.get('Seconds_Behind_Master') is not None:
+                data['Seconds_Behind_Master'] = slave['Seconds_Behind_Master']
+            for running in ('Slave_IO_Running', 'Slave_SQL_Running'):
+                data[running] = 1 if slave.get(running) == 'Yes' else 0
+        elif name == 'processlist':
+            for key, value in zip(PROCESSLIST, rows[0]):
+                data[key] = int(value or 0)
+        elif name == 'digests':
+            self._parse_digests(rows, data)
+
+    def get_data(self):
+        """
+        Get raw data from MySQL server. All queries are sent in one batch.
         :return: dict
         """
+        if self.connection is not None:
+            self._keepalive()
         if self.connection is None:
+            # unreachable server gives no data without failing the update, so job's retries aren't used up
+            # and it keeps reconnecting with backoff
+            if time.time() < self._next_connect:
+                self.debug("waiting", str(int(self._next_connect - time.time())), "seconds before connecting again")
+                return {}
+            if not self.connect():
+                return {}
+        # statement which fails (ex. not permitted) is disabled and batch is sent again without it,
+        # so there are at most as many retries as statements
+        for _ in range(len(self.queries) + 3):
+            queries = [query for query in self.queries if query[0] not in self._disabled]
+            variables = time.time() >= self._next_variables and 'variables' not in self._disabled
+            if variables:
+                queries.append(('variables', QUERY_VARIABLES.format(", ".join("'" + name + "'" for name in VARIABLES))))
+            if self.digests_top > 0 and 'digests' not in self._disabled:
+                queries.append(('digests', QUERY_DIGESTS.format(self._digests_seen, self.digests_max)))
+            data = {}
+            done = 0
             try:
-                self._connect()
-            except RuntimeError:
-                return None
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(QUERY)
-            raw_data = cursor.fetchall()
-        except Exception as e:
-            self.error("cannot execute query.", e)
-            self.connection.close()
-            self.connection = None
+                cursor = self.connection.cursor()
+                cursor.execute("; ".join(query for _, query in queries))
+                for name, _ in queries:
+                    if done > 0:
+                        cursor.nextset()
+                    self._parse_result(name, cursor, data)
+                    done += 1
+                cursor.close()
+                break
+            except Exception as e:
+                lost = len(e.args) == 0 or e.args[0] in CONNECTION_LOST
+                if done == 0 or lost:
+                    self.error("cannot execute query.", str(e))
+                    if lost:
+                        self.disconnect()
+                    return None
+                # statement not permitted or not supported by this server, statements after it were not executed
+                self.error("cannot execute query '" + queries[done][1] + "', skipping it.", str(e))
+                self._disabled.add(queries[done][0])
+                if queries[done][0] == 'variables':
+                    self._next_variables = time.time() + VARIABLES_EVERY
+        else:
             return None
-        data = dict(raw_data)
+        self._last_used = time.time()
+        if variables:
+            self._variables = dict((key, data[key]) for key in VARIABLES if key in data)
+            self._next_variables = time.time() + VARIABLES_EVERY
+        data.update(self._variables)
+
         try:
-            data["Thread_cache_misses"] = int(data["Threads_created"] * 10000 / float(data["Connections"]))
+            data["Thread_cache_misses"] = int(int(data["Threads_created"]) * 10000 / float(data["Connections"]))
         except:
             data["Thread_cache_misses"] = 0
+        data['collector_connects'] = self.connects
+        data['collector_connect_time'] = int(self.connect_time * 1000000)
+
+        return data
+
+
+class Service(SimpleService):
+    def __init__(self, configuration=None, name=None):
+        SimpleService.__init__(self, configuration=configuration, name=name)
+        if self.name is None:
+            self.name = 'local'
+        self.order = ORDER
+        self.definitions = CHARTS
+        self.servers = []
+        # worker threads querying servers of multi-server job
+        self.concurrency = CONCURRENCY
+        self._tasks = queue.Queue()
+        self._threads = []
+
+    def _add_servers(self, servers):
+        """
+        Create servers of multi-server job and their charts
+        :param servers: list
+        :return: boolean
+        """
+        defaults = dict((key, self.configuration[key]) for key in SERVER_DEFAULTS if key in self.configuration)
+        self.order = []
+        self.definitions = {}
+        for server in servers:
+            if not isinstance(server, dict):
+                self.error("server should be a dictionary of options, not", str(server))
+                return False
+            name = server.get('name') or server.get('host') or server.get('socket') or server.get('my.cnf')
+            name = SERVER_NAME.sub("_", str(name)).strip("_")
+            if name == "" or name in [s.name for s in self.servers]:
+                self.error("every server needs an unique name:", str(server))
+                return False
+            self.servers.append(Server(self, dict(defaults, **server), name))
+            order, definitions = _server_charts(name)
+            self.order.extend(order)
+            self.definitions.update(definitions)
+        return len(self.servers) > 0
 
+    def _worker(self):
+        """
+        Worker thread. Queries servers taken from the queue.
+        """
+        while True:
+            server, submitted, results = self._tasks.get()
+            try:
+                data = server.get_data()
+            except Exception as e:
+                server.error("cannot collect data:", str(e))
+                data = None
+            server.busy = False
+            results.put((server, submitted, data))
+
+    def _collect(self):
+        """
+        Query all servers of multi-server job concurrently.
+        Data of servers not responding within their `timeout` is skipped and a server isn't
+        queried again until its previous query finishes.
+        :return: list - [(server, data)]
+        """
+        results = queue.Queue()
+        pending = 0
+        deadline = time.time()
+        for server in self.servers:
+            if server.busy:
+                server.debug("previous update hasn't finished yet")
+                continue
+            server.busy = True
+            submitted = time.time()
+            deadline = max(deadline, submitted + server.timeout)
+            self._tasks.put((server, submitted, results))
+            pending += 1
+
+        collected = []
+        while pending > 0:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                server, submitted, data = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending -= 1
+            if time.time() - submitted > server.timeout:
+                server.debug("data came after deadline, skipping it")
+            elif data is not None:
+                collected.append((server, data))
+        if pending > 0:
+            self.debug(str(pending), "servers didn't respond in time")
+        return collected
+
+    def _get_data(self):
+        """
+        Get raw data from MySQL server(s).
+        Data keys of servers of multi-server job are prefixed with server name.
+        :return: dict
+        """
+        if self.servers[0].name is None:
+            return self.servers[0].get_data()
+        collected = self._collect()
+        if len(collected) == 0:
+            return None
+        data = {}
+        for server, values in collected:
+            prefix = server.name + "_"
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    value = dict((prefix + k, v) for k, v in value.items())
+                data[prefix + key] = value
         return data
 
     def check(self):
         """
-        Check if service is able to connect to server
+        Check if service is able to connect to server(s)
         :return: boolean
         """
+        queries = _build_queries()
+        servers = self.configuration.get('servers')
+        if servers is None:
+            self.servers = [Server(self, self.configuration)]
+            self.servers[0].queries = queries
+            return self.servers[0].connect()
+
+        if not isinstance(servers, list):
+            self.error("'servers' should be a list of servers")
+            return False
+        if not self._add_servers(servers):
+            return False
+        for server in self.servers:
+            server.queries = queries
         try:
-            self.connection = self._connect()
-            return True
-        except RuntimeError:
-            self.connection = None
+            self.concurrency = int(self.configuration['concurrency'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        for _ in range(max(min(self.concurrency, len(self.servers)), 1)):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        if self._get_data() is None:
+            self.error("none of", str(len(self.servers)), "servers is available")
             return False
+        return True
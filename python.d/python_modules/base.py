@@ -3,19 +3,395 @@
 # Author: Pawel Krupa (paulfantom)
 
 import time
-import sys
 import os
 import socket
 import select
+import errno
+import base64
+import re
 try:
-    import urllib.request as urllib2
+    from urllib.parse import urlsplit, urljoin, unquote
 except ImportError:
-    import urllib2
+    from urlparse import urlsplit, urljoin, unquote
+try:
+    from urllib.request import getproxies, proxy_bypass
+except ImportError:
+    from urllib import getproxies, proxy_bypass
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib
+try:
+    import ssl
+except ImportError:
+    ssl = None
+try:
+    import selectors
+except ImportError:
+    selectors = None
 
 from subprocess import Popen, PIPE
 
 import threading
+import atexit
 import msg
+import output
+import resolver
+from framing import HTTPFramer
+from tail import Tail, load_checkpoint, save_checkpoint
+
+# initial size of reusable socket receive buffers
+RECEIVE_BUFFER = 16384
+
+# events awaited by non-blocking data collection (see BaseService._get_raw_data_async)
+EVENT_READ = 1
+EVENT_WRITE = 2
+
+# delay (in seconds) before racing a slow connection attempt with the next address
+CONNECT_DELAY = 0.25
+
+# maximum number of log bytes read in one update, backlog is read in following updates
+LOG_READ_LIMIT = 4194304
+
+# position in followed logs is saved every LOG_CHECKPOINT_EVERY seconds (and at exit) to this directory
+LOG_CHECKPOINT_EVERY = 60
+LOG_CHECKPOINT_DIR = os.path.join(os.getenv('NETDATA_CACHE_DIR', '/var/cache/netdata'), 'python.d')
+
+
+class Poller(object):
+    """
+    Waits for events of many file descriptors. Uses epoll/poll (selectors on python3,
+    select.poll() on python2), so unlike select() it works with descriptors above FD_SETSIZE (1024).
+    """
+
+    def __init__(self):
+        if selectors is not None:
+            self._selector = selectors.DefaultSelector()
+        else:
+            self._selector = None
+            self._poll = select.poll()
+
+    def register(self, fd, event):
+        """
+        :param fd: int
+        :param event: int - EVENT_READ or EVENT_WRITE
+        """
+        if self._selector is not None:
+            self._selector.register(fd, selectors.EVENT_WRITE if event == EVENT_WRITE else selectors.EVENT_READ)
+        else:
+            self._poll.register(fd, select.POLLOUT if event == EVENT_WRITE else select.POLLIN)
+
+    def unregister(self, fd):
+        """
+        Stop watching descriptor, it could have been closed already
+        :param fd: int
+        """
+        try:
+            if self._selector is not None:
+                self._selector.unregister(fd)
+            else:
+                self._poll.unregister(fd)
+        except (KeyError, ValueError, OSError):
+            pass
+
+    def poll(self, timeout=None):
+        """
+        Wait for events (errors and hangups count as events too)
+        :param timeout: float/None - seconds, None waits forever
+        :return: list - ready file descriptors
+        """
+        if self._selector is not None:
+            return [key.fd for key, _ in self._selector.select(timeout)]
+        if timeout is not None:
+            timeout = int(timeout * 1000 + 0.999)
+        return [fd for fd, _ in self._poll.poll(timeout)]
+
+    def close(self):
+        if self._selector is not None:
+            self._selector.close()
+
+
+def _interleave(addresses, preferred=None):
+    """
+    Order addresses for connection racing: previously working address first,
+    then alternate between address families (RFC 8305).
+    :param addresses: list
+    :param preferred: tuple
+    :return: list
+    """
+    families = []
+    groups = {}
+    for res in addresses:
+        if res[0] not in groups:
+            families.append(res[0])
+            groups[res[0]] = []
+        groups[res[0]].append(res)
+    ordered = []
+    while len(ordered) < len(addresses):
+        for family in families:
+            if len(groups[family]) > 0:
+                ordered.append(groups[family].pop(0))
+    if preferred in ordered:
+        ordered.remove(preferred)
+        ordered.insert(0, preferred)
+    return ordered
+
+
+def _connect_nonblocking(addresses, result, delay=CONNECT_DELAY):
+    """
+    Non-blocking connect racing all addresses (happy eyeballs).
+    Next address is tried every `delay` seconds while previous attempts are still in progress,
+    first established connection wins.
+    Generator yielding (sockets, EVENT_WRITE, delay) and receiving the socket which became ready.
+    Connected socket and its address info are appended to `result` list.
+    :param addresses: list
+    :param result: list
+    :param delay: float
+    """
+    addresses = list(addresses)
+    pending = {}
+    try:
+        while len(addresses) > 0 or len(pending) > 0:
+            if len(addresses) > 0:
+                res = addresses.pop(0)
+                af, socktype, proto, canonname, sa = res
+                try:
+                    sock = socket.socket(af, socktype, proto)
+                except socket.error:
+                    continue
+                try:
+                    sock.setblocking(0)
+                    err = sock.connect_ex(sa)
+                except socket.error:
+                    sock.close()
+                    continue
+                if err == 0:
+                    result.append((sock, res))
+                    return
+                if err not in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                    sock.close()
+                    continue
+                pending[sock] = res
+            if len(pending) == 0:
+                continue
+            ready = yield list(pending), EVENT_WRITE, delay if len(addresses) > 0 else None
+            if ready is None:
+                # attempt is taking too long, start racing it with next address
+                continue
+            res = pending.pop(ready)
+            if ready.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                result.append((ready, res))
+                return
+            ready.close()
+    finally:
+        for sock in pending:
+            sock.close()
+
+
+class _Pipe(object):
+    """
+    Read end of a pipe waited for like a socket
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def fileno(self):
+        return self.fd
+
+
+def _call_in_thread(function, args, result):
+    """
+    Run blocking function (ex. DNS lookup) in a thread, so event loop doesn't wait for it.
+    Generator yielding (pipe, EVENT_READ) until function returns. Returned value is appended
+    to `result` list, exception raised by function is raised by generator.
+    :param function: function
+    :param args: tuple
+    :param result: list
+    """
+    read_fd, write_fd = os.pipe()
+    outcome = []
+
+    def run():
+        try:
+            outcome.append((True, function(*args)))
+        except Exception as e:
+            outcome.append((False, e))
+        try:
+            os.write(write_fd, b".")
+        except OSError:
+            # caller gave up waiting and closed its end
+            pass
+        finally:
+            os.close(write_fd)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    pipe = _Pipe(read_fd)
+    try:
+        while len(outcome) == 0:
+            yield pipe, EVENT_READ
+    finally:
+        os.close(read_fd)
+    succeeded, value = outcome[0]
+    if not succeeded:
+        raise value
+    result.append(value)
+
+
+def _resolve_nonblocking(host, port, ttl, result):
+    """
+    Get addresses of host:port without blocking. Cached addresses are used right away,
+    otherwise host is resolved in a thread.
+    Generator (see _call_in_thread), addresses are appended to `result` list.
+    :param host: str
+    :param port: int
+    :param ttl: int
+    :param result: list
+    """
+    addresses = resolver.cached(host, port, ttl)
+    if addresses is not None:
+        result.append(addresses)
+        return
+    for event in _call_in_thread(resolver.resolve, (host, port, ttl), result):
+        yield event
+
+
+def _run_blocking(generator, timeout):
+    """
+    Drive non-blocking generator (see BaseService._get_raw_data_async) with a Poller
+    until it finishes. socket.timeout is raised into it after `timeout` seconds.
+    :param generator: generator
+    :param timeout: float
+    """
+    deadline = time.time() + timeout
+    value = None
+    error = None
+    poller = Poller()
+    try:
+        while True:
+            try:
+                if error is None:
+                    step = generator.send(value)
+                else:
+                    step = generator.throw(error)
+            except StopIteration:
+                return
+            value = None
+            error = None
+            socks = step[0] if isinstance(step[0], (list, tuple)) else [step[0]]
+            wait = deadline - time.time()
+            if wait <= 0:
+                error = socket.timeout("timed out")
+                continue
+            if len(step) > 2 and step[2] is not None:
+                wait = min(wait, step[2])
+            fds = [sock.fileno() for sock in socks]
+            for fd in fds:
+                poller.register(fd, step[1])
+            try:
+                ready = poller.poll(wait)
+            finally:
+                for fd in fds:
+                    poller.unregister(fd)
+            if len(ready) > 0:
+                value = socks[fds.index(ready[0])]
+            elif time.time() >= deadline:
+                error = socket.timeout("timed out")
+    finally:
+        poller.close()
+
+
+def _create_connection(host, port, timeout, ttl=resolver.DNS_TTL):
+    """
+    Blocking connect to host:port using cached addresses, racing them and giving up after `timeout` seconds.
+    :param host: str
+    :param port: int
+    :param timeout: float
+    :param ttl: int
+    :return: socket
+    """
+    connected = []
+    try:
+        _run_blocking(_connect_nonblocking(_interleave(resolver.resolve(host, port, ttl)), connected), timeout)
+    except socket.timeout:
+        pass
+    if len(connected) == 0:
+        resolver.invalidate(host, port)
+        raise socket.error("cannot connect to " + str(host) + ":" + str(port) + " in " + str(timeout) + " seconds")
+    sock = connected[0][0]
+    sock.settimeout(timeout)
+    return sock
+
+
+class _HTTPConnection(httplib.HTTPConnection):
+    """
+    HTTP connection using cached addresses and connection racing
+    """
+    dns_ttl = resolver.DNS_TTL
+
+    def connect(self):
+        self.sock = _create_connection(self.host, self.port, self.timeout, self.dns_ttl)
+
+
+if ssl is not None:
+    class _HTTPSConnection(httplib.HTTPSConnection):
+        """
+        HTTPS connection which resumes TLS session of its previous connection
+        (when supported by python), so reconnecting doesn't need a full handshake.
+        """
+        session = None
+        dns_ttl = resolver.DNS_TTL
+
+        def connect(self):
+            if not hasattr(ssl, 'SSLSession') or not hasattr(self, '_context'):
+                httplib.HTTPSConnection.connect(self)
+                return
+            self.sock = _create_connection(self.host, self.port, self.timeout, self.dns_ttl)
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host, session=self.session)
+            self.session = self.sock.session
+else:
+    _HTTPSConnection = None
+
+
+def _compile_definition(definition):
+    """
+    Compile chart definition into read-only (options, lines, dynamic rule) tuple.
+    Dynamic rule is a dictionary:
+        'match': regex matching data keys (first group is used as dimension name)
+        'id': format of dimension id ({0} is replaced with dimension name), by default data key is used
+        'names': data key of {data key: dimension name} dictionary overriding names taken from regex
+        'algorithm', 'multiplier', 'divisor': dimension parameters
+        'limit': maximum number of dimensions, keys with highest values are charted first
+    :param definition: dict
+    :return: tuple
+    """
+    rule = definition.get('dynamic')
+    if rule is not None:
+        rule = (re.compile(rule['match']), rule.get('id'), rule.get('names'), rule.get('algorithm', 'absolute'),
+                rule.get('multiplier', 1), rule.get('divisor', 1), rule.get('limit'))
+    return tuple(definition['options']), tuple(tuple(line) for line in definition['lines']), rule
+
+
+# compiled chart definitions shared by all jobs of a module: {id(definitions): (definitions, schema)}
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def _compile_schema(definitions):
+    """
+    Get compiled definitions of all charts. Every definitions dictionary is compiled only once.
+    :param definitions: dict
+    :return: dict
+    """
+    with _schemas_lock:
+        entry = _schemas.get(id(definitions))
+        if entry is None or entry[0] is not definitions:
+            entry = (definitions, dict((name, _compile_definition(definition))
+                                       for name, definition in definitions.items()))
+            _schemas[id(definitions)] = entry
+    return entry[1]
 
 
 class BaseService(threading.Thread):
@@ -30,7 +406,9 @@ class BaseService(threading.Thread):
         :param name: str
         """
         threading.Thread.__init__(self)
-        self._data_stream = ""
+        # protocol lines are collected as list of fragments and joined once in commit()
+        self._data_stream = []
+        self._begin_pos = 0
         self.daemon = True
         self.retries = 0
         self.retries_left = 0
@@ -39,9 +417,11 @@ class BaseService(threading.Thread):
         self.name = name
         self.override_name = None
         self.chart_name = ""
-        self._dimensions = []
-        self._charts = []
+        self._dimensions = set()
+        self._charts = set()
         self.__chart_set = False
+        # True if job can collect data with _get_raw_data_async()
+        self.asynchronous = False
         if configuration is None:
             self.error("BaseService: no configuration parameters supplied. Cannot create Service.")
             raise RuntimeError
@@ -120,14 +500,37 @@ class BaseService(threading.Thread):
         #run_time_chart += "SET run_time = " + run_time + '\n'
         #run_time_chart += "END\n"
         #sys.stdout.write(run_time_chart)
-        sys.stdout.write("BEGIN netdata.plugin_pythond_%s %s\nSET run_time = %s\nEND\n" % \
-                         (self.chart_name, str(since_last), run_time))
+        output.write("BEGIN netdata.plugin_pythond_%s %s\nSET run_time = %s\nEND\n" % \
+                     (self.chart_name, str(since_last), run_time))
 
         #msg.debug(self.chart_name + " updated in " + str(run_time) + " ms")
         msg.debug(self.chart_name, "updated in", str(run_time), "ms")
         self.timetable['last'] = t_start
         return True
 
+    def _run_step(self):
+        """
+        Executes job once and handles retries.
+        Used both by job thread and by scheduler.
+        Return value is a number of seconds to wait before next step or None if job should be stopped
+        :return: float/None
+        """
+        try:
+            status = self._run_once()
+        except Exception as e:
+            msg.error("Something wrong: ", str(e))
+            return None
+        if status:
+            self.retries_left = self.retries
+            return max(self.timetable['next'] - time.time(), 0)
+        else:
+            self.retries_left -= 1
+            if self.retries_left <= 0:
+                msg.error("no more retries. Exiting")
+                return None
+            else:
+                return self.timetable['freq']
+
     def run(self):
         """
         Runs job in thread. Handles retries.
@@ -136,21 +539,20 @@ class BaseService(threading.Thread):
         """
         self.timetable['last'] = time.time()
         while True:
-            try:
-                status = self._run_once()
-            except Exception as e:
-                msg.error("Something wrong: ", str(e))
+            delay = self._run_step()
+            if delay is None:
                 return
-            if status:
-                time.sleep(self.timetable['next'] - time.time())
-                self.retries_left = self.retries
-            else:
-                self.retries_left -= 1
-                if self.retries_left <= 0:
-                    msg.error("no more retries. Exiting")
-                    return
-                else:
-                    time.sleep(self.timetable['freq'])
+            time.sleep(delay)
+
+    def _get_raw_data_async(self):
+        """
+        Non-blocking data collection prototype used by scheduler in asynchronous mode.
+        Generator yielding (socket, event) tuples when it needs to wait for socket.
+        Instead of one socket it can yield a list of them and an optional delay: (sockets, event, delay).
+        Socket which became ready (or None when delay passed first) is sent back to generator.
+        Collected data should be returned by following _get_raw_data() call.
+        """
+        return iter(())
 
     @staticmethod
     def _format(*args):
@@ -175,7 +577,7 @@ class BaseService(threading.Thread):
         #self._data_stream += instruction
         tmp = list(map((lambda x: "''" if x is None or len(x) == 0 else x), params))
 
-        self._data_stream += "%s %s\n" % (instruction, str(" ".join(tmp)))
+        self._data_stream.append("%s %s\n" % (instruction, str(" ".join(tmp))))
 
         # self.error(str(" ".join(tmp)))
         # for p in params:
@@ -204,7 +606,7 @@ class BaseService(threading.Thread):
         :param priority: int/str
         :param update_every: int/str
         """
-        self._charts.append(type_id)
+        self._charts.add(type_id)
         #self._line("CHART", type_id, name, title, units, family, category, charttype, priority, update_every)
 
         p = self._format(type_id, name, title, units, family, category, charttype, priority, update_every)
@@ -236,7 +638,7 @@ class BaseService(threading.Thread):
         if algorithm not in ("absolute", "incremental", "percentage-of-absolute-row", "percentage-of-incremental-row"):
             algorithm = "absolute"
 
-        self._dimensions.append(str(id))
+        self._dimensions.add(str(id))
         if hidden:
             p = self._format(id, name, algorithm, multiplier, divisor, "hidden")
             #self._line("DIMENSION", id, name, algorithm, str(multiplier), str(divisor), "hidden")
@@ -262,6 +664,7 @@ class BaseService(threading.Thread):
             self.error("malformed begin statement: microseconds are not a number:", microseconds)
             microseconds = ""
 
+        self._begin_pos = len(self._data_stream)
         self._line("BEGIN", type_id, str(microseconds))
         return True
 
@@ -277,10 +680,10 @@ class BaseService(threading.Thread):
             return False
         try:
             value = str(int(value))
-        except TypeError:
+        except (TypeError, ValueError):
             self.error("cannot set non-numeric value:", value)
             return False
-        self._line("SET", id, "=", str(value))
+        self._data_stream.append("SET " + id + " = " + value + "\n")
         self.__chart_set = True
         return True
 
@@ -289,15 +692,15 @@ class BaseService(threading.Thread):
             self._line("END")
             self.__chart_set = False
         else:
-            pos = self._data_stream.rfind("BEGIN")
-            self._data_stream = self._data_stream[:pos]
+            del self._data_stream[self._begin_pos:]
 
     def commit(self):
         """
         Upload new data to netdata
         """
-        print(self._data_stream)
-        self._data_stream = ""
+        self._data_stream.append("\n")
+        output.write("".join(self._data_stream))
+        self._data_stream = []
 
     def error(self, *params):
         """
@@ -347,6 +750,18 @@ class SimpleService(BaseService):
     def __init__(self, configuration=None, name=None):
         self.order = []
         self.definitions = {}
+        # per job changes of chart definitions: {chart: {key: value}}, module definitions are shared and never modified
+        self.overlay = {}
+        # precompiled charts: [["BEGIN type_id ", [(dimension_id, "SET dimension_id = "), ...]], ...]
+        self._templates = []
+        self._template_index = {}
+        # created charts: {name: [type_id, options]}
+        self._chart_options = {}
+        # rules of charts with dynamic dimensions and data keys already checked against them
+        self._dynamic = []
+        self._known_keys = set()
+        # dimensions of created charts which had no data yet: {data key: [(chart, line), ...]}
+        self._pending = {}
         BaseService.__init__(self, configuration=configuration, name=name)
 
     def _get_data(self):
@@ -362,6 +777,111 @@ class SimpleService(BaseService):
         """
         return True
 
+    @staticmethod
+    def _get_percentiles(sketch, prefix, percentiles=(50, 90, 99), reset=True):
+        """
+        Turn values counted by sketch (see sketch.py) since last update into dimensions:
+        prefix + 'p50', ... for every percentile, prefix + 'avg' and prefix + 'max'.
+        Nothing is returned if nothing was counted, so charts show a gap instead of zeros.
+        :param sketch: Sketch
+        :param prefix: str
+        :param percentiles: iterable - sorted percentiles (0-100)
+        :param reset: boolean - start counting again for next update
+        :return: dict
+        """
+        data = {}
+        count = sketch.count
+        if count > 0:
+            values = sketch.quantiles([percentile / 100.0 for percentile in percentiles])
+            for percentile, value in zip(percentiles, values):
+                data[prefix + 'p' + str(percentile)] = value
+            data[prefix + 'avg'] = sketch.total // count
+            data[prefix + 'max'] = sketch.max
+        if reset:
+            sketch.reset()
+        return data
+
+    def _compile_chart(self, name, type_id, dimensions):
+        """
+        Precompile protocol fragments used to update a chart every time
+        :param name: str
+        :param type_id: str
+        :param dimensions: list
+        """
+        template = ["BEGIN " + type_id + " ", [(dim, "SET " + dim + " = ") for dim in dimensions]]
+        self._template_index[name] = template
+        self._templates.append(template)
+
+    def _add_dimensions(self, name, lines):
+        """
+        Add dimensions to already created chart and its precompiled template
+        :param name: str
+        :param lines: list
+        """
+        type_id, options = self._chart_options[name]
+        self.chart(type_id, *options)
+        dimensions = self._template_index[name][1]
+        for line in lines:
+            self.dimension(*line)
+            dimensions.append((str(line[0]), "SET " + str(line[0]) + " = "))
+        self.commit()
+
+    @staticmethod
+    def _match_rule(rule, keys, data):
+        """
+        Create lines for data keys matching dynamic rule which aren't charted yet
+        :param rule: list
+        :param keys: iterable
+        :param data: dict
+        :return: list
+        """
+        name, regex, id_format, names, algorithm, multiplier, divisor, limit, charted = rule
+        names = data.get(names) or {}
+        matched = []
+        for key in keys:
+            if key in charted:
+                continue
+            match = regex.match(key)
+            if match is not None:
+                matched.append((key, match.group(1) if regex.groups > 0 else None))
+        if limit is not None:
+            matched.sort(key=lambda m: data[m[0]], reverse=True)
+            matched = matched[:max(limit - len(charted), 0)]
+        else:
+            matched.sort()
+        lines = []
+        for key, dim_name in matched:
+            charted.add(key)
+            if id_format is not None:
+                key = id_format.format(dim_name)
+            lines.append([key, names.get(key, dim_name), algorithm, multiplier, divisor])
+        return lines
+
+    def _add_dynamic(self, data):
+        """
+        Add dimensions for data keys which appeared since last check.
+        Only keys never seen before are matched against rules, so it is cheap when nothing changes.
+        :param data: dict
+        """
+        keys = set(data)
+        keys.difference_update(self._known_keys)
+        if len(keys) == 0:
+            return
+        self._known_keys.update(keys)
+        if len(self._pending) > 0:
+            found = {}
+            for key in keys.intersection(self._pending):
+                for name, line in self._pending.pop(key):
+                    found.setdefault(name, []).append(line)
+            for name, lines in found.items():
+                self.debug("adding dimensions to", name, "chart:", str([line[0] for line in lines]))
+                self._add_dimensions(name, lines)
+        for rule in self._dynamic:
+            lines = self._match_rule(rule, keys, data)
+            if len(lines) > 0:
+                self.debug("adding dimensions to", rule[0], "chart:", str([line[0] for line in lines]))
+                self._add_dimensions(rule[0], lines)
+
     def create(self):
         """
         Create charts
@@ -372,13 +892,37 @@ class SimpleService(BaseService):
             return False
 
         idx = 0
+        self._templates = []
+        self._template_index = {}
+        self._chart_options = {}
+        self._dynamic = []
+        self._known_keys = set(data)
+        self._pending = {}
+        schema = _compile_schema(self.definitions)
         for name in self.order:
-            options = self.definitions[name]['options'] + [self.priority + idx, self.update_every]
-            self.chart(self.chart_name + "." + name, *options)
+            if name in self.overlay:
+                options, lines, rule = _compile_definition(dict(self.definitions[name], **self.overlay[name]))
+            else:
+                options, lines, rule = schema[name]
+            options = list(options) + [self.priority + idx, self.update_every]
+            type_id = self.chart_name + "." + name
+            self.chart(type_id, *options)
+            self._chart_options[name] = [type_id, options]
             # check if server has this datapoint
-            for line in self.definitions[name]['lines']:
+            dimensions = []
+            for line in lines:
                 if line[0] in data:
                     self.dimension(*line)
+                    dimensions.append(str(line[0]))
+                else:
+                    self._pending.setdefault(line[0], []).append((name, line))
+            if rule is not None:
+                rule = [name] + list(rule) + [set(dimensions)]
+                self._dynamic.append(rule)
+                for line in self._match_rule(rule, data, data):
+                    self.dimension(*line)
+                    dimensions.append(str(line[0]))
+            self._compile_chart(name, type_id, dimensions)
             idx += 1
 
         self.commit()
@@ -395,22 +939,42 @@ class SimpleService(BaseService):
             self.debug("_get_data() returned no data")
             return False
 
-        updated = False
-        for chart in self.order:
-            if self.begin(self.chart_name + "." + chart, interval):
-                updated = True
-                for dim in self.definitions[chart]['lines']:
-                    try:
-                        self.set(dim[0], data[dim[0]])
-                    except KeyError:
-                        pass
-                self.end()
+        if len(self._dynamic) > 0 or len(self._pending) > 0:
+            self._add_dynamic(data)
+        return self._update_charts(data, interval)
+
+    def _update_charts(self, data, interval):
+        """
+        Send collected data using precompiled charts
+        :param data: dict
+        :param interval: int
+        :return: boolean
+        """
+        stream = self._data_stream
+        append = stream.append
+        interval = str(interval) + "\n"
+        for begin, dimensions in self._templates:
+            pos = len(stream)
+            append(begin + interval)
+            for dim, prefix in dimensions:
+                value = data.get(dim)
+                if value is None:
+                    continue
+                try:
+                    append(prefix + str(int(value)) + "\n")
+                except (TypeError, ValueError):
+                    self.error("cannot set non-numeric value:", str(value))
+            if len(stream) - pos > 1:
+                append("END\n")
+            else:
+                del stream[pos:]
 
         self.commit()
-        if not updated:
+        if len(self._templates) == 0:
             self.error("no charts to update")
+            return False
 
-        return updated
+        return True
 
 
 class UrlService(SimpleService):
@@ -418,34 +982,296 @@ class UrlService(SimpleService):
         self.url = ""
         self.user = None
         self.password = None
+        self.token = None
+        # headers sent with every request, authorization is sent preemptively
+        self.headers = {'User-Agent': 'netdata'}
+        self._async_data = None
+        self._async_ready = False
+        self._async_sock = None
+        # host:port the persistent connection of _get_raw_data_async() is connected to
+        self._async_netloc = None
+        self._async_buffer = bytearray(RECEIVE_BUFFER)
+        self._async_framer = HTTPFramer()
+        self.dns_ttl = resolver.DNS_TTL
+        # persistent http connections: {'scheme://host:port': HTTPConnection}
+        self._connections = {}
+        self.connections_new = 0
+        self.connections_reused = 0
         SimpleService.__init__(self, configuration=configuration, name=name)
 
-    def __add_auth(self):
-        passman = urllib2.HTTPPasswordMgrWithDefaultRealm()
-        passman.add_password(None, self.url, self.user, self.password)
-        authhandler = urllib2.HTTPBasicAuthHandler(passman)
-        opener = urllib2.build_opener(authhandler)
-        urllib2.install_opener(opener)
-
     def _get_raw_data(self):
         """
         Get raw data from http request
         :return: str
         """
-        raw = None
+        if self._async_ready:
+            self._async_ready = False
+            return self._async_data
+
         try:
-            f = urllib2.urlopen(self.url, timeout=self.update_every)
+            url = self.url
+            # follow a few redirects like urllib does
+            for _ in range(5):
+                status, reason, location, body = self._http_get(url)
+                if status in (301, 302, 303, 307, 308) and location is not None:
+                    # location can be relative (ex. '/server-status/')
+                    url = urljoin(url, location)
+                    continue
+                break
+            if status != 200:
+                self.error("HTTP Error " + str(status) + ": " + str(reason))
+                return None
+            raw = body.decode('utf-8')
         except Exception as e:
             self.error(str(e))
             return None
+        self.debug("http connections new:", str(self.connections_new), "reused:", str(self.connections_reused))
+        return raw
+
+    @staticmethod
+    def _get_proxy(url):
+        """
+        Proxy for url set in environment (http_proxy, https_proxy and no_proxy), as used by urllib
+        :param url: SplitResult
+        :return: SplitResult/None
+        """
+        proxy = getproxies().get(url.scheme)
+        if not proxy or proxy_bypass(url.hostname):
+            return None
+        if "://" not in proxy:
+            proxy = "http://" + proxy
+        return urlsplit(proxy)
 
+    @staticmethod
+    def _get_proxy_headers(proxy):
+        """
+        :param proxy: SplitResult
+        :return: dict
+        """
+        if proxy.username is None:
+            return {}
+        credentials = (unquote(proxy.username) + ":" + unquote(proxy.password or "")).encode('utf-8')
+        return {'Proxy-Authorization': "Basic " + base64.b64encode(credentials).decode('ascii')}
+
+    def _get_connection(self, url):
+        """
+        Get persistent connection to host:port of url (or to proxy).
+        Connection's `proxy_headers` are sent with every request when plain http is forwarded by proxy.
+        :param url: SplitResult
+        :return: HTTPConnection
+        """
+        key = url.scheme + "://" + url.netloc
         try:
-            raw = f.read().decode('utf-8')
+            return self._connections[key]
+        except KeyError:
+            pass
+        proxy = self._get_proxy(url)
+        proxy_headers = None
+        if url.scheme == "https":
+            if _HTTPSConnection is None:
+                raise ValueError("https is not supported by this python")
+            if proxy is None:
+                conn = _HTTPSConnection(url.netloc, timeout=self.update_every)
+            else:
+                # tunnel through proxy with CONNECT
+                conn = httplib.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=self.update_every)
+                conn.set_tunnel(url.hostname, url.port or 443, self._get_proxy_headers(proxy))
+        elif url.scheme == "http":
+            if proxy is None:
+                conn = _HTTPConnection(url.netloc, timeout=self.update_every)
+            else:
+                conn = _HTTPConnection(proxy.hostname, proxy.port or 80, timeout=self.update_every)
+                proxy_headers = self._get_proxy_headers(proxy)
+        else:
+            raise ValueError("unsupported url: " + url.geturl())
+        conn.proxy_headers = proxy_headers
+        conn.dns_ttl = self.dns_ttl
+        self._connections[key] = conn
+        return conn
+
+    def _http_get(self, url):
+        """
+        Send GET request over persistent HTTP/1.1 connection.
+        Stale connection (ex. closed by server) is transparently reopened once.
+        :param url: str
+        :return: tuple
+        """
+        url = urlsplit(url)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        conn = self._get_connection(url)
+        headers = self.headers
+        if conn.proxy_headers is not None:
+            # proxy needs absolute url
+            path = url.scheme + "://" + url.netloc + path
+            headers = dict(headers, **conn.proxy_headers)
+        while True:
+            fresh = conn.sock is None
+            if fresh:
+                self.connections_new += 1
+            else:
+                self.connections_reused += 1
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (httplib.HTTPException, socket.error):
+                conn.close()
+                if fresh:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+            return response.status, response.reason, response.getheader('location'), body
+
+    def _get_raw_data_async(self):
+        """
+        Get raw data from plain http request without blocking.
+        Redirects are followed like in _get_raw_data(). Job is collected by workers
+        from the next update when it is redirected to https.
+        :return: generator
+        """
+        raw = None
+        try:
+            url = self.url
+            for _ in range(5):
+                split = urlsplit(url)
+                if split.scheme != "http":
+                    self.asynchronous = False
+                    raise ValueError("cannot follow redirect to " + url + " without blocking, "
+                                     "next updates will use blocking requests")
+                response = []
+                requesting = self._http_get_async(split, response)
+                try:
+                    ready = None
+                    while True:
+                        try:
+                            event = requesting.send(ready)
+                        except StopIteration:
+                            break
+                        ready = yield event
+                finally:
+                    requesting.close()
+                status, location, received = response[0]
+                if status in (301, 302, 303, 307, 308) and location is not None:
+                    url = urljoin(url, location)
+                    continue
+                break
+            if status != 200:
+                raise ValueError("HTTP error: " + self._async_framer.headers.split("\r\n")[0])
+            raw = self._async_framer.body(self._async_buffer, received).decode('utf-8')
+        except socket.timeout:
+            self.error("Connection timed out.")
+            self._close_async()
         except Exception as e:
             self.error(str(e))
+            self._close_async()
         finally:
-            f.close()
-        return raw
+            self._async_data = raw
+            self._async_ready = True
+
+    def _http_get_async(self, url, response):
+        """
+        Non-blocking version of _http_get().
+        Uses persistent HTTP/1.1 connection, response is read into reusable buffer
+        and framed incrementally (see framing.HTTPFramer).
+        Stale connection (ex. closed by server) is transparently reopened once.
+        (status, location, received bytes) tuple is appended to `response` list.
+        :param url: SplitResult
+        :param response: list
+        :return: generator
+        """
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        request = "GET %s HTTP/1.1\r\nHost: %s\r\n" % (path, url.netloc)
+        for header in self.headers.items():
+            request += "%s: %s\r\n" % header
+        request = (request + "\r\n").encode()
+        if self._async_sock is not None and self._async_netloc != url.netloc:
+            # redirected to other server
+            self._close_async()
+        while True:
+            fresh = self._async_sock is None
+            if fresh:
+                connected = []
+                addresses = []
+                for event in _resolve_nonblocking(url.hostname, url.port or 80, self.dns_ttl, addresses):
+                    yield event
+                connecting = _connect_nonblocking(_interleave(addresses[0]), connected)
+                try:
+                    ready = None
+                    while True:
+                        try:
+                            event = connecting.send(ready)
+                        except StopIteration:
+                            break
+                        ready = yield event
+                finally:
+                    connecting.close()
+                if len(connected) == 0:
+                    resolver.invalidate(url.hostname, url.port or 80)
+                    raise socket.error("cannot connect to " + url.geturl())
+                self._async_sock = connected[0][0]
+                self._async_netloc = url.netloc
+                self.connections_new += 1
+            else:
+                self.connections_reused += 1
+            sock = self._async_sock
+            self._async_framer.reset()
+            received = 0
+            try:
+                data = request
+                while len(data) > 0:
+                    yield sock, EVENT_WRITE
+                    data = data[sock.send(data):]
+                while True:
+                    yield sock, EVENT_READ
+                    if received == len(self._async_buffer):
+                        self._async_buffer.extend(bytearray(len(self._async_buffer)))
+                    view = memoryview(self._async_buffer)
+                    try:
+                        size = sock.recv_into(view[received:])
+                    finally:
+                        del view
+                    if size == 0:
+                        break
+                    start = received
+                    received += size
+                    if self._async_framer.feed(self._async_buffer, start, received):
+                        break
+            except socket.error:
+                self._close_async()
+                if fresh:
+                    raise
+                continue
+            if self._async_framer.headers is None:
+                # connection closed before response
+                self._close_async()
+                if fresh:
+                    raise socket.error("connection closed by " + url.geturl())
+                continue
+            break
+        if size == 0 or self._async_framer.keep_alive is False:
+            self._close_async()
+        location = None
+        for line in self._async_framer.headers.split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "location":
+                location = value.strip()
+        response.append((self._async_framer.status(), location, received))
+
+    def _close_async(self):
+        """
+        Close persistent connection used by _get_raw_data_async()
+        """
+        if self._async_sock is not None:
+            try:
+                self._async_sock.close()
+            except socket.error:
+                pass
+            self._async_sock = None
 
     def check(self):
         """
@@ -470,8 +1296,27 @@ class UrlService(SimpleService):
         except (KeyError, TypeError):
             pass
 
+        try:
+            self.token = str(self.configuration['token'])
+        except (KeyError, TypeError):
+            pass
+        try:
+            self.dns_ttl = int(self.configuration['dns_ttl'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        try:
+            for key, value in self.configuration['headers'].items():
+                self.headers[str(key)] = str(value)
+        except (KeyError, TypeError, AttributeError):
+            pass
+
         if self.user is not None and self.password is not None:
-            self.__add_auth()
+            credentials = (self.user + ":" + self.password).encode('utf-8')
+            self.headers['Authorization'] = "Basic " + base64.b64encode(credentials).decode('ascii')
+        elif self.token is not None:
+            self.headers['Authorization'] = "Bearer " + self.token
+        # non-blocking collection connects directly, requests through proxy are made by workers
+        self.asynchronous = self.url.startswith("http://") and self._get_proxy(urlsplit(self.url)) is None
 
         if self._get_data() is not None:
             return True
@@ -486,53 +1331,73 @@ class SocketService(SimpleService):
         self.host = "localhost"
         self.port = None
         self.unix_socket = None
+        # unix socket types tried in order
+        self._unix_types = [socket.SOCK_STREAM, socket.SOCK_DGRAM]
         self.request = ""
+        self.dns_ttl = resolver.DNS_TTL
         self.__socket_config = None
+        self._async_data = None
+        self._async_ready = False
+        # reusable receive buffer, response framer (see framing.py) and connection state
+        self._buffer = bytearray(RECEIVE_BUFFER)
+        self._received = 0
+        self._framer = None
+        self._eof = False
+        # time (in seconds) from sending last request to receiving whole response
+        self.round_trip = None
         SimpleService.__init__(self, configuration=configuration, name=name)
+        self.asynchronous = True
 
     def _connect(self):
         """
         Recreate socket and connect to it since sockets cannot be reused after closing
         Available configurations are IPv6, IPv4 or UNIX socket
+        Connecting is given up after update_every seconds.
         :return:
         """
         try:
             if self.unix_socket is None:
-                if self.__socket_config is None:
-                    # establish ipv6 or ipv4 connection.
-                    for res in socket.getaddrinfo(self.host, self.port, socket.AF_UNSPEC, socket.SOCK_STREAM):
-                        try:
-                            af, socktype, proto, canonname, sa = res
-                            self._sock = socket.socket(af, socktype, proto)
-                        except socket.error as msg:
-                            self._sock = None
-                            continue
-                        try:
-                            self._sock.connect(sa)
-                        except socket.error as msg:
-                            self._disconnect()
-                            continue
-                        self.__socket_config = res
-                        break
-                else:
-                    # connect to socket with previously established configuration
-                    try:
-                        af, socktype, proto, canonname, sa = self.__socket_config
-                        self._sock = socket.socket(af, socktype, proto)
-                        self._sock.connect(sa)
-                    except socket.error as msg:
-                        self._disconnect()
+                _run_blocking(self._connect_async(), self.update_every)
             else:
-                # connect to unix socket
-                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
-                self._sock.connect(self.unix_socket)
+                self._connect_unix()
         except Exception as e:
             self.error(str(e),
                        "Cannot create socket with following configuration: host:", str(self.host),
                        "port:", str(self.port),
                        "socket:", str(self.unix_socket))
-            self._sock = None
-        self._sock.setblocking(0)
+            self._disconnect()
+        if self._sock is not None:
+            self._sock.setblocking(0)
+
+    def _connect_unix(self):
+        """
+        Connect to unix socket
+        :return:
+        """
+        self._sock = self._open_unix()
+
+    def _open_unix(self):
+        """
+        Open connection to unix socket. Stream socket is tried first, datagram one when server doesn't support streams.
+        Socket names starting with '@' are in abstract namespace.
+        :return: socket
+        """
+        address = self.unix_socket
+        if address.startswith("@"):
+            address = "\0" + address[1:]
+        for socktype in self._unix_types:
+            sock = socket.socket(socket.AF_UNIX, socktype)
+            sock.settimeout(self.update_every)
+            try:
+                sock.connect(address)
+            except socket.error as e:
+                sock.close()
+                if e.errno == errno.EPROTOTYPE and socktype != self._unix_types[-1]:
+                    continue
+                raise
+            # remember working socket type
+            self._unix_types = [socktype]
+            return sock
 
     def _disconnect(self):
         """
@@ -564,52 +1429,179 @@ class SocketService(SimpleService):
                 return False
         return True
 
+    def _reset_buffer(self):
+        """
+        Prepare receive buffer and framer for new response
+        """
+        self._received = 0
+        self._eof = False
+        if self._framer is not None:
+            self._framer.reset()
+
+    def _read_available(self):
+        """
+        Read data waiting in socket directly into receive buffer.
+        Only new bytes are passed to framer. Modules without framer get
+        decoded data passed to _check_raw_data().
+        :return: boolean - True if response is complete
+        """
+        if self._received == len(self._buffer):
+            self._buffer.extend(bytearray(len(self._buffer)))
+        view = memoryview(self._buffer)
+        try:
+            size = self._sock.recv_into(view[self._received:])
+        finally:
+            del view
+        if size == 0:  # handle server disconnect
+            self._eof = True
+            return True
+        start = self._received
+        self._received += size
+        if self._framer is not None:
+            return self._framer.feed(self._buffer, start, self._received)
+        return self._check_raw_data(self._buffer[:self._received].decode())
+
     def _receive(self):
         """
         Receive data from socket
         :return: str
         """
-        data = ""
-        while True:
-            try:
-                ready_to_read, _, in_error = select.select([self._sock], [], [], 15)
-            except Exception as e:
-                self.debug("SELECT", str(e))
-                self._disconnect()
-                break
-            if len(ready_to_read) > 0:
-                buf = self._sock.recv(4096)
-                if len(buf) == 0 or buf is None:  # handle server disconnect
+        self._reset_buffer()
+        poller = Poller()
+        try:
+            poller.register(self._sock.fileno(), EVENT_READ)
+            while True:
+                try:
+                    ready_to_read = poller.poll(15)
+                except Exception as e:
+                    self.debug("SELECT", str(e))
+                    self._disconnect()
                     break
-                data += buf.decode()
-                if self._check_raw_data(data):
+                if len(ready_to_read) > 0:
+                    try:
+                        if self._read_available():
+                            break
+                    except socket.error as e:
+                        self.error("Cannot receive data:", str(e))
+                        self._disconnect()
+                        break
+                else:
+                    self.error("Socket timed out.")
+                    self._disconnect()
                     break
-            else:
-                self.error("Socket timed out.")
-                self._disconnect()
-                break
+        finally:
+            poller.close()
 
-        return data
+        return self._buffer[:self._received].decode()
+
+    def _finish_response(self):
+        """
+        Close connection if it isn't going to be reused
+        """
+        if not self._keep_alive or self._eof or (self._framer is not None and self._framer.keep_alive is False):
+            self._disconnect()
 
     def _get_raw_data(self):
         """
         Get raw data with low-level "socket" module.
         :return: str
         """
+        if self._async_ready:
+            self._async_ready = False
+            return self._async_data
+
         if self._sock is None:
             self._connect()
 
         # Send request if it is needed
+        t_start = time.time()
         if not self._send():
             return None
 
         data = self._receive()
-
-        if not self._keep_alive:
-            self._disconnect()
+        self.round_trip = time.time() - t_start
+        self._finish_response()
 
         return data
 
+    def _connect_async(self):
+        """
+        Non-blocking version of _connect()
+        Addresses are cached for dns_ttl seconds and raced (happy eyeballs),
+        address of previous connection is tried first. Uncached host is resolved
+        and unix socket is connected in a thread.
+        :return: generator
+        """
+        if self.unix_socket is not None:
+            connected = []
+            for event in _call_in_thread(self._open_unix, (), connected):
+                yield event
+            self._sock = connected[0]
+            self._sock.setblocking(0)
+            return
+        addresses = []
+        for event in _resolve_nonblocking(self.host, self.port, self.dns_ttl, addresses):
+            yield event
+        connected = []
+        connecting = _connect_nonblocking(_interleave(addresses[0], self.__socket_config), connected)
+        try:
+            ready = None
+            while True:
+                try:
+                    event = connecting.send(ready)
+                except StopIteration:
+                    break
+                ready = yield event
+        except socket.timeout:
+            resolver.invalidate(self.host, self.port)
+            raise
+        finally:
+            connecting.close()
+        if len(connected) > 0:
+            self._sock, self.__socket_config = connected[0]
+        else:
+            resolver.invalidate(self.host, self.port)
+            self.error("Cannot connect with following configuration: host:", str(self.host),
+                       "port:", str(self.port))
+
+    def _get_raw_data_async(self):
+        """
+        Get raw data with low-level "socket" module without blocking.
+        :return: generator
+        """
+        data = None
+        try:
+            if self._sock is None:
+                for event in self._connect_async():
+                    yield event
+            if self._sock is not None:
+                t_start = time.time()
+                request = self.request
+                while len(request) > 0:
+                    yield self._sock, EVENT_WRITE
+                    request = request[self._sock.send(request):]
+                self._reset_buffer()
+                while True:
+                    yield self._sock, EVENT_READ
+                    if self._read_available():
+                        break
+                self.round_trip = time.time() - t_start
+                data = self._buffer[:self._received].decode()
+        except socket.timeout:
+            self.error("Socket timed out.")
+            self._disconnect()
+        except Exception as e:
+            self.error(str(e),
+                       "used configuration: host:", str(self.host),
+                       "port:", str(self.port),
+                       "socket:", str(self.unix_socket))
+            self._disconnect()
+        finally:
+            if self._sock is not None:
+                self._finish_response()
+            self._async_data = data
+            self._async_ready = True
+
     def _check_raw_data(self, data):
         """
         Check if all data has been gathered from socket
@@ -639,6 +1631,10 @@ class SocketService(SimpleService):
                 self.port = int(self.configuration['port'])
             except (KeyError, TypeError):
                 self.debug("No port specified. Using: '" + str(self.port) + "'")
+            try:
+                self.dns_ttl = int(self.configuration['dns_ttl'])
+            except (KeyError, TypeError, ValueError):
+                pass
         try:
             self.request = str(self.configuration['request'])
         except (KeyError, TypeError):
@@ -649,35 +1645,114 @@ class SocketService(SimpleService):
 class LogService(SimpleService):
     def __init__(self, configuration=None, name=None):
         self.log_path = ""
+        # None means end of file
         self._last_position = 0
-        # self._log_reader = None
+        self.read_limit = LOG_READ_LIMIT
+        self._tail = None
+        self._creating = False
+        # file with position saved across restarts, None if disabled
+        self.checkpoint = True
+        self._checkpoint_file = None
+        self._next_checkpoint = 0
         SimpleService.__init__(self, configuration=configuration, name=name)
         self.retries = 100000  # basically always retry
 
+    def _get_raw_chunks(self):
+        """
+        Get log data since last poll in chunks of complete lines.
+        At most `read_limit` bytes are read, so memory use is bounded and big backlog is read in parts.
+        :return: generator of bytes
+        """
+        if self._tail is None:
+            self._open_tail()
+        elif self._tail.position != self._last_position:
+            self._tail.seek(self._last_position)
+        if self._creating:
+            return
+        try:
+            for chunk in self._tail.chunks(self.read_limit):
+                self._last_position = self._tail.position
+                yield chunk
+        except (IOError, OSError) as e:
+            self.error(str(e))
+        self._last_position = self._tail.position
+        if self._checkpoint_file is not None and time.time() >= self._next_checkpoint:
+            self._next_checkpoint = time.time() + LOG_CHECKPOINT_EVERY
+            self._save_checkpoint()
+
+    def _open_tail(self):
+        """
+        Start following log, at saved checkpoint if there is one
+        """
+        self._tail = Tail(self.log_path, self._last_position)
+        if self.checkpoint:
+            self._checkpoint_file = os.path.join(LOG_CHECKPOINT_DIR, self.chart_name + ".state")
+            checkpoint = load_checkpoint(self._checkpoint_file)
+            if checkpoint is not None and checkpoint.get('path') == self.log_path:
+                if self._tail.restore(checkpoint):
+                    self.info("resuming", self.log_path, "at offset", str(self._tail.position))
+                else:
+                    # log was replaced while netdata wasn't running
+                    self.info(self.log_path, "changed since checkpoint, reading it from start")
+                    self._tail.seek(0)
+            self._next_checkpoint = time.time() + LOG_CHECKPOINT_EVERY
+            atexit.register(self._save_checkpoint)
+        self._last_position = self._tail.position
+
+    def _save_checkpoint(self):
+        """
+        Save position in log, so it is read from there after restart
+        """
+        checkpoint = self._tail.checkpoint() if self._tail is not None else None
+        if checkpoint is None or self._checkpoint_file is None:
+            return
+        try:
+            if not os.path.isdir(LOG_CHECKPOINT_DIR):
+                os.makedirs(LOG_CHECKPOINT_DIR)
+            save_checkpoint(self._checkpoint_file, checkpoint)
+        except (IOError, OSError) as e:
+            self.error("cannot save checkpoint, disabling it:", str(e))
+            self._checkpoint_file = None
+
+    def _get_lines(self):
+        """
+        Get log lines since last poll one by one
+        :return: generator of str
+        """
+        for chunk in self._get_raw_chunks():
+            if str is not bytes:
+                chunk = chunk.decode('utf-8', 'replace')
+            for line in chunk.splitlines(True):
+                yield line
+
+    def _count_raw(self, patterns):
+        """
+        Count new log lines and occurrences of patterns in them.
+        Raw chunks are searched at once, lines aren't split and decoded,
+        so patterns should appear at most once per line.
+        :param patterns: list of bytes
+        :return: tuple - (list of pattern counts, number of lines)
+        """
+        counts = [0] * len(patterns)
+        lines = 0
+        for chunk in self._get_raw_chunks():
+            lines += chunk.count(b"\n")
+            for i, pattern in enumerate(patterns):
+                counts[i] += chunk.count(pattern)
+        return counts, lines
+
     def _get_raw_data(self):
         """
         Get log lines since last poll
         :return: list
         """
-        lines = []
-        try:
-            if os.path.getsize(self.log_path) < self._last_position:
-                self._last_position = 0
-            elif os.path.getsize(self.log_path) == self._last_position:
-                self.debug("Log file hasn't changed. No new data.")
-                return None
-            with open(self.log_path, "r") as fp:
-                fp.seek(self._last_position)
-                for i, line in enumerate(fp):
-                    lines.append(line)
-                self._last_position = fp.tell()
-        except Exception as e:
-            self.error(str(e))
+        lines = list(self._get_lines())
 
-        if len(lines) != 0:
+        # log isn't read in create(), but modules expect data there
+        if len(lines) != 0 or self._creating:
             return lines
         else:
-            self.error("No data collected.")
+            self.debug("Log file hasn't changed. No new data.")
             return None
 
     def check(self):
@@ -693,6 +1768,19 @@ class LogService(SimpleService):
             self.log_path = str(self.configuration['path'])
         except (KeyError, TypeError):
             self.error("No path to log specified. Using: '" + self.log_path + "'")
+        try:
+            self.read_limit = int(self.configuration['read_limit'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        try:
+            if self.configuration['from_end'] is True:
+                self._last_position = None
+        except (KeyError, TypeError):
+            pass
+        try:
+            self.checkpoint = self.configuration['checkpoint'] is not False
+        except (KeyError, TypeError):
+            pass
 
         if os.access(self.log_path, os.R_OK):
             return True
@@ -701,9 +1789,15 @@ class LogService(SimpleService):
             return False
 
     def create(self):
-        status = SimpleService.create(self)
-        self._last_position = 0
-        return status
+        """
+        Create charts. Log isn't read, so lines logged so far are counted by first update.
+        :return: boolean
+        """
+        self._creating = True
+        try:
+            return SimpleService.create(self)
+        finally:
+            self._creating = False
 
 
 class ExecutableService(SimpleService):
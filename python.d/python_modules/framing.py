@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# Description: incremental response framing for netdata python.d socket modules
+
+
+class Framer(object):
+    """
+    Prototype of framer.
+    Framer decides when a complete response has been received. Data is fed incrementally:
+    every call gets the whole receive buffer and the range of bytes which are new,
+    so already received data is never scanned again.
+    """
+
+    # False if peer is going to close connection after this response, None if unknown
+    keep_alive = None
+
+    def reset(self):
+        """
+        Prepare for new response
+        """
+        pass
+
+    def feed(self, buf, start, end):
+        """
+        Check if response is complete
+        :param buf: bytearray
+        :param start: int - first new byte
+        :param end: int - end of received data
+        :return: boolean
+        """
+        return True
+
+
+class LengthPrefixedFramer(Framer):
+    """
+    Response starting with its length, ex. redis bulk string:
+        $<length>\r\n<payload>\r\n
+    """
+
+    def __init__(self, prefix=b"$", delimiter=b"\r\n"):
+        """
+        :param prefix: bytes
+        :param delimiter: bytes
+        """
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self._expected = None
+
+    def reset(self):
+        self._expected = None
+
+    def feed(self, buf, start, end):
+        if self._expected is None:
+            pos = buf.find(self.delimiter, max(start - len(self.delimiter) + 1, 0), end)
+            if pos < 0:
+                return False
+            if buf[:len(self.prefix)] != self.prefix:
+                # not a length prefixed response, nothing to wait for
+                return True
+            try:
+                length = int(buf[len(self.prefix):pos])
+            except ValueError:
+                return True
+            if length < 0:
+                return True
+            self._expected = pos + len(self.delimiter) + length + len(self.delimiter)
+        return end >= self._expected
+
+
+class TerminatorFramer(Framer):
+    """
+    Response ending with terminator.
+    When `multiple` is set response is complete only if number of received terminators is its multiple
+    (ex. hddtemp sends 5 '|' separated fields per disk).
+    """
+
+    def __init__(self, terminator=b"\n", multiple=1):
+        """
+        :param terminator: bytes
+        :param multiple: int
+        """
+        self.terminator = terminator
+        self.multiple = max(multiple, 1)
+        self._count = 0
+        self._pos = 0
+
+    def reset(self):
+        self._count = 0
+        self._pos = 0
+
+    def feed(self, buf, start, end):
+        size = len(self.terminator)
+        pos = buf.find(self.terminator, self._pos, end)
+        while pos >= 0:
+            self._count += 1
+            pos = buf.find(self.terminator, pos + size, end)
+        # terminator can be split between two reads
+        self._pos = max(end - size + 1, self._pos)
+        if self._count == 0 or buf[end - size:end] != self.terminator:
+            return False
+        return self._count % self.multiple == 0
+
+
+class HTTPFramer(Framer):
+    """
+    HTTP/1.x response with `Content-Length` or `Transfer-Encoding: chunked` body.
+    Responses without them are complete when server closes connection.
+    """
+
+    def __init__(self):
+        self.headers = None
+        self.keep_alive = None
+        self._body_start = None
+        self._length = None
+        self._chunked = False
+        self._chunks = []
+        self._pos = 0
+
+    def reset(self):
+        self.__init__()
+
+    def _parse_headers(self, buf, end):
+        """
+        Parse response headers when all of them are received
+        :return: boolean
+        """
+        pos = buf.find(b"\r\n\r\n", max(self._pos - 3, 0), end)
+        if pos < 0:
+            self._pos = end
+            return False
+        self._body_start = pos + 4
+        self._pos = self._body_start
+        self.headers = bytes(buf[:pos]).decode('latin-1')
+        lines = self.headers.split("\r\n")
+        self.keep_alive = lines[0].startswith("HTTP/1.1")
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == "content-length":
+                try:
+                    self._length = int(value)
+                except ValueError:
+                    pass
+            elif name == "transfer-encoding":
+                self._chunked = "chunked" in value
+            elif name == "connection":
+                self.keep_alive = value == "keep-alive"
+        if not self._chunked and self._length is None:
+            # body ends with connection
+            self.keep_alive = False
+        return True
+
+    def _parse_chunks(self, buf, end):
+        """
+        Walk chunk headers received so far
+        :return: boolean
+        """
+        while self._pos < end:
+            line_end = buf.find(b"\r\n", self._pos, end)
+            if line_end < 0:
+                return False
+            try:
+                size = int(bytes(buf[self._pos:line_end]).split(b";")[0], 16)
+            except ValueError:
+                return True
+            if size == 0:
+                # last chunk, no trailers expected
+                return end >= line_end + 4
+            chunk_start = line_end + 2
+            self._chunks.append((chunk_start, chunk_start + size))
+            self._pos = chunk_start + size + 2
+        return False
+
+    def feed(self, buf, start, end):
+        if self._body_start is None and not self._parse_headers(buf, end):
+            return False
+        if self._chunked:
+            return self._parse_chunks(buf, end)
+        if self._length is not None:
+            return end >= self._body_start + self._length
+        return False
+
+    def status(self):
+        """
+        Response status code
+        :return: int
+        """
+        try:
+            return int(self.headers.split(" ", 2)[1])
+        except (AttributeError, IndexError, ValueError):
+            return 0
+
+    def body(self, buf, end):
+        """
+        Response body without chunked encoding
+        :param buf: bytearray
+        :param end: int
+        :return: bytes
+        """
+        if self._body_start is None:
+            return b""
+        if self._chunked:
+            return b"".join(bytes(buf[s:min(e, end)]) for s, e in self._chunks)
+        if self._length is not None:
+            end = min(end, self._body_start + self._length)
+        return bytes(buf[self._body_start:end])
+
+
+class RESPError(Exception):
+    """
+    Error reply of redis server
+    """
+    pass
+
+
+class RESPFramer(Framer):
+    """
+    Replies of pipelined redis (RESP protocol) commands.
+    Response is complete when `expected` replies are received. Replies are parsed
+    while they arrive and are available in `replies` (error replies as RESPError).
+    """
+
+    def __init__(self, expected=1):
+        """
+        :param expected: int
+        """
+        self.expected = expected
+        self.replies = []
+        self.invalid = False
+        self._pos = 0
+
+    def reset(self):
+        self.replies = []
+        self.invalid = False
+        self._pos = 0
+
+    def _parse(self, buf, pos, end):
+        """
+        Parse one reply starting at `pos`
+        :param buf: bytearray
+        :param pos: int
+        :param end: int
+        :return: tuple - (reply, position after it) or None when reply isn't complete yet
+        """
+        line_end = buf.find(b"\r\n", pos, end)
+        if line_end < 0:
+            return None
+        kind = buf[pos:pos + 1]
+        head = bytes(buf[pos + 1:line_end])
+        pos = line_end + 2
+        if kind == b"+":
+            return head.decode('utf-8', 'replace'), pos
+        if kind == b"-":
+            return RESPError(head.decode('utf-8', 'replace')), pos
+        if kind == b":":
+            return int(head), pos
+        if kind == b"$":
+            length = int(head)
+            if length < 0:
+                return None, pos
+            if end < pos + length + 2:
+                return None
+            return bytes(buf[pos:pos + length]).decode('utf-8', 'replace'), pos + length + 2
+        if kind == b"*":
+            length = int(head)
+            if length < 0:
+                return None, pos
+            items = []
+            for _ in range(length):
+                item = self._parse(buf, pos, end)
+                if item is None:
+                    return None
+                items.append(item[0])
+                pos = item[1]
+            return items, pos
+        raise ValueError("unknown RESP type " + repr(bytes(kind)))
+
+    def feed(self, buf, start, end):
+        while len(self.replies) < self.expected:
+            try:
+                reply = self._parse(buf, self._pos, end)
+            except ValueError:
+                # not a redis server, nothing to wait for
+                self.invalid = True
+                return True
+            if reply is None:
+                return False
+            self.replies.append(reply[0])
+            self._pos = reply[1]
+        return True
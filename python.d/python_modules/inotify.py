@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Description: minimal ctypes binding of linux inotify for netdata python.d modules
+
+import os
+import errno
+import struct
+from ctypes import CDLL, c_char_p, c_int, c_uint32, get_errno
+from ctypes.util import find_library
+
+# events (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+# flags of inotify_init1()
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_EVENT = struct.Struct("iIII")
+
+try:
+    _libc = CDLL(find_library('c'), use_errno=True)
+    _init1 = _libc.inotify_init1
+    _init1.argtypes = [c_int]
+    _init1.restype = c_int
+    _add_watch = _libc.inotify_add_watch
+    _add_watch.argtypes = [c_int, c_char_p, c_uint32]
+    _add_watch.restype = c_int
+    _rm_watch = _libc.inotify_rm_watch
+    _rm_watch.argtypes = [c_int, c_int]
+    _rm_watch.restype = c_int
+    AVAILABLE = True
+except (OSError, AttributeError, TypeError):
+    # not linux or libc can't be loaded
+    AVAILABLE = False
+
+
+def _check(result, path=None):
+    """
+    Raise OSError when libc call failed
+    :param result: int
+    :param path: str
+    :return: int
+    """
+    if result < 0:
+        error_number = get_errno()
+        raise OSError(error_number, os.strerror(error_number), path)
+    return result
+
+
+class Inotify(object):
+    """
+    Non-blocking inotify instance. Events are read without waiting,
+    so it can be polled once per update instead of stat()ing watched files.
+    """
+
+    def __init__(self):
+        if not AVAILABLE:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = _check(_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """
+        Watch file or directory. Watching already watched inode returns its watch descriptor.
+        :param path: str
+        :param mask: int
+        :return: int - watch descriptor
+        """
+        if not isinstance(path, bytes):
+            path = path.encode('utf-8')
+        return _check(_add_watch(self.fd, path, mask), path)
+
+    def rm_watch(self, wd):
+        """
+        Stop watching. Watch could have been removed already by kernel (ex. file was deleted).
+        :param wd: int
+        """
+        _rm_watch(self.fd, wd)
+
+    def read(self):
+        """
+        Get pending events
+        :return: list - [(wd, mask, cookie, name), ...]
+        """
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    return events
+                raise
+            if not buf:
+                return events
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                wd, mask, cookie, length = _EVENT.unpack_from(buf, pos)
+                pos += _EVENT.size
+                name = buf[pos:pos + length].rstrip(b"\0").decode('utf-8', 'replace')
+                pos += length
+                events.append((wd, mask, cookie, name))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
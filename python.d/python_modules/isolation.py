@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+# Description: process isolation for netdata python.d jobs
+
+import os
+import sys
+import time
+import struct
+import select
+import signal
+import atexit
+import threading
+import subprocess
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import msg
+
+# time (in seconds) given to a new worker process to start and run job's check()
+STARTUP_TIMEOUT = 60
+# time (in seconds) given to a worker process to exit (ex. save log checkpoint) when it is stopped
+STOP_TIMEOUT = 5
+
+# attributes set by job's check() which supervisor needs to create and update charts
+CHECK_STATE = ('name', 'override_name', 'order', 'definitions', 'overlay')
+# attributes of supervisor's job sent with every call, worker's copy of job uses them too
+FORWARDED = ('chart_name', '_creating')
+
+# worker is a new interpreter, plugin is never forked while its threads may hold locks
+_WORKER = "import sys; sys.path.insert(0, sys.argv[1]); import isolation; isolation.main()"
+_HEADER = struct.Struct("!I")
+
+# running worker processes, stopped gracefully when plugin exits
+_processes = []
+_processes_lock = threading.Lock()
+
+
+def _send(fd, obj):
+    """
+    Write length prefixed pickle to pipe
+    :param fd: int
+    :param obj: object
+    """
+    data = pickle.dumps(obj, 2)
+    data = _HEADER.pack(len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read(fd, size):
+    """
+    Read exactly size bytes from pipe
+    :param fd: int
+    :param size: int
+    :return: bytes
+    """
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if not chunk:
+            raise EOFError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(fd):
+    """
+    Read object written with _send()
+    :param fd: int
+    :return: object
+    """
+    size = _HEADER.unpack(_read(fd, _HEADER.size))[0]
+    return pickle.loads(_read(fd, size))
+
+
+def _load_module(path, name):
+    """
+    Import module the way python.d.plugin does
+    :param path: str
+    :param name: str
+    :return: object
+    """
+    try:
+        import importlib.machinery
+        return importlib.machinery.SourceFileLoader(name, path).load_module()
+    except ImportError:
+        import imp
+        return imp.load_source(name, path)
+
+
+def main():
+    """
+    Worker process main loop.
+    Creates its own copy of a job, runs check() and then answers calls
+    of job methods sent by supervisor on stdin. Job exits (and runs its atexit
+    handlers) when supervisor closes stdin or on SIGTERM.
+    """
+    requests = sys.stdin.fileno()
+    # only supervisor talks to netdata, anything job prints goes to stderr
+    replies = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    setup = _recv(requests)
+    msg.PROGRAM = setup['program']
+    msg.DEBUG_FLAG = setup['debug']
+    service = getattr(_load_module(setup['path'], setup['module']), 'Service')
+    job = service(configuration=setup['configuration'], name=setup['name'])
+    job.chart_name = setup['chart_name']
+    try:
+        result = bool(job.check())
+        if not result:
+            job.error("check function failed in worker process.")
+    except Exception as e:
+        job.error("check function failed in worker process:", str(e))
+        result = False
+    _send(replies, (0, (result, dict((key, getattr(job, key)) for key in CHECK_STATE if hasattr(job, key)))))
+
+    while True:
+        try:
+            seq, method, state = _recv(requests)
+        except (EOFError, OSError):
+            return
+        for key, value in state.items():
+            setattr(job, key, value)
+        try:
+            result = getattr(job, method)()
+        except Exception as e:
+            job.error(method + "() failed in worker process:", str(e))
+            result = None
+        try:
+            _send(replies, (seq, result))
+        except OSError:
+            return
+
+
+def _shutdown(processes):
+    """
+    Ask worker processes to exit and kill those which don't in STOP_TIMEOUT seconds
+    :param processes: list
+    """
+    for process in processes:
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+    deadline = time.time() + STOP_TIMEOUT
+    for process in processes:
+        while process.poll() is None and time.time() < deadline:
+            time.sleep(0.05)
+        if process.poll() is None:
+            msg.error("worker process", str(process.pid), "didn't exit in", str(STOP_TIMEOUT), "seconds. Killing it.")
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+def _shutdown_all():
+    with _processes_lock:
+        processes = _processes[:]
+        del _processes[:]
+    _shutdown(processes)
+
+
+atexit.register(_shutdown_all)
+
+
+class ProcessWorker(object):
+    """
+    Runs a copy of a job in a separate process, out of reach of supervisor's GIL.
+    Worker runs job's check() and _get_data(), supervisor's job keeps ownership of
+    stdout and timetable. Only check() result with chart definitions and parsed data
+    dictionaries returned by _get_data() are sent back from worker.
+    """
+
+    def __init__(self, job, service, configuration, timeout=1):
+        """
+        :param job: object - supervisor's job
+        :param service: class
+        :param configuration: dict
+        :param timeout: int
+        """
+        self.job = job
+        path = os.path.abspath(sys.modules[service.__module__].__file__)
+        if path.endswith(".pyc"):
+            path = path[:-1]
+        self.setup = {'path': path,
+                      'module': service.__module__,
+                      'configuration': dict(configuration),
+                      'name': job.name}
+        self.timeout = timeout
+        self.process = None
+        self._seq = 0
+        self._started = False
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start worker process (a new interpreter, so its state is not inherited from plugin)
+        """
+        directory = os.path.dirname(os.path.abspath(__file__))
+        self.process = subprocess.Popen([sys.executable, "-c", _WORKER, directory],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True)
+        with _processes_lock:
+            _processes.append(self.process)
+        self._poller = select.poll()
+        self._poller.register(self.process.stdout.fileno(), select.POLLIN)
+        self._started = False
+        setup = dict(self.setup, chart_name=self.job.chart_name, program=msg.PROGRAM, debug=msg.DEBUG_FLAG)
+        try:
+            _send(self.process.stdin.fileno(), setup)
+        except OSError as e:
+            msg.error(self.job.chart_name, "cannot start worker process:", str(e))
+        msg.debug(self.job.chart_name, "started worker process", str(self.process.pid))
+
+    def stop(self):
+        """
+        Stop worker process, giving it time to exit cleanly
+        """
+        process, self.process = self.process, None
+        if process is None:
+            return
+        with _processes_lock:
+            if process in _processes:
+                _processes.remove(process)
+        _shutdown([process])
+
+    def _answer(self, process, seq, timeout):
+        """
+        Wait for answer to request
+        :param process: subprocess.Popen
+        :param seq: int
+        :param timeout: int
+        :return: tuple - (answered, result)
+        """
+        deadline = time.time() + timeout
+        fd = process.stdout.fileno()
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self._poller.poll(int(remaining * 1000) + 1):
+                return False, None
+            answer_seq, result = _recv(fd)
+            # skip late answers to calls which already timed out
+            if answer_seq == seq:
+                return True, result
+
+    def call(self, method, state=None):
+        """
+        Execute job method in worker process and return its result.
+        Returns None when worker doesn't answer in time.
+        :param method: str
+        :param state: dict - attributes set on worker's job before the call
+        :return: object
+        """
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                if self.process is not None:
+                    msg.error(self.job.chart_name, "worker process died. Restarting it.")
+                    self.stop()
+                self.start()
+            process = self.process
+            timeout = self.timeout if self._started else STARTUP_TIMEOUT
+            self._seq += 1
+            try:
+                _send(process.stdin.fileno(), (self._seq, method, state or {}))
+                answered, result = self._answer(process, self._seq, timeout)
+            except (EOFError, IOError, OSError, ValueError) as e:
+                # ValueError: worker was stopped in the meantime and its pipes are closed
+                msg.error(self.job.chart_name, "lost connection with worker process:", str(e))
+                self.stop()
+                return None
+            if answered:
+                self._started = True
+                return result
+            msg.error(self.job.chart_name, "worker process didn't answer in", str(timeout), "seconds")
+            return None
+
+    def check(self):
+        """
+        Proxy for job's check(), which worker runs right after it starts.
+        Chart definitions prepared by check() are copied to supervisor's job.
+        :return: boolean
+        """
+        with self._lock:
+            if self.process is None:
+                self.start()
+            try:
+                answered, answer = self._answer(self.process, 0, STARTUP_TIMEOUT)
+            except (EOFError, IOError, OSError, ValueError) as e:
+                msg.error(self.job.chart_name, "lost connection with worker process:", str(e))
+                self.stop()
+                return False
+        if not answered:
+            msg.error(self.job.chart_name, "worker process didn't finish check in", str(STARTUP_TIMEOUT), "seconds")
+            return False
+        result, state = answer
+        for key, value in state.items():
+            setattr(self.job, key, value)
+        self._started = result
+        return result
+
+    def get_data(self):
+        """
+        Proxy for job's _get_data()
+        :return: dict
+        """
+        job = self.job
+        return self.call('_get_data', dict((key, getattr(job, key)) for key in FORWARDED if hasattr(job, key)))
+
+
+def isolate(job, service, configuration):
+    """
+    Make job check and collect its data in a worker process.
+    Job still runs create() and update() in supervisor,
+    but check() and every _get_data() call are executed by worker.
+    :param job: object
+    :param service: class
+    :param configuration: dict
+    :return: ProcessWorker
+    """
+    worker = ProcessWorker(job, service, configuration, job.update_every)
+    job.check = worker.check
+    job._get_data = worker.get_data
+    job.asynchronous = False
+    return worker
@@ -3,6 +3,8 @@
 
 import sys
 
+import output
+
 DEBUG_FLAG = False
 PROGRAM = ""
 
@@ -45,7 +47,9 @@ def info(*args):
 def fatal(*args):
     """
     Print message on stderr and exit.
+    DISABLE is queued after data already buffered for netdata, so it is never written in the middle of a block.
     """
     log_msg("FATAL", *args)
-    sys.stdout.write('DISABLE\n')
+    output.write('DISABLE\n')
+    output.flush()
     sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Description: buffered output for netdata python.d modules
+
+import sys
+import time
+import threading
+
+# data is written to netdata immediately when this many bytes are buffered
+MAX_BUFFER = 1048576
+
+
+class Multiplexer(object):
+    """
+    Collects complete BEGIN/SET/END (and CHART/DIMENSION) blocks from all jobs
+    and writes them to netdata in large batches.
+    Blocks are never split, so lines coming from different threads cannot interleave.
+    """
+
+    def __init__(self, stream, max_size=MAX_BUFFER):
+        """
+        :param stream: file
+        :param max_size: int
+        """
+        self.stream = stream
+        self.max_size = max_size
+        self._buffer = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # statistics
+        self.bytes = 0
+        self.writes = 0
+        self.blocked = 0.0
+
+    def write(self, block):
+        """
+        Queue complete block of protocol lines.
+        Flushes buffer when it is full (writer waits for netdata then).
+        :param block: str
+        """
+        with self._lock:
+            self._buffer.append(block)
+            self._size += len(block)
+            full = self._size >= self.max_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write everything collected so far with one write to netdata
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._size == 0:
+                    return
+                data = "".join(self._buffer)
+                self._buffer = []
+                self._size = 0
+            t_start = time.time()
+            self.stream.write(data)
+            self.stream.flush()
+            self.blocked += time.time() - t_start
+            self.writes += 1
+            self.bytes += len(data)
+
+
+_multiplexer = Multiplexer(sys.stdout)
+
+
+def write(block):
+    """
+    Queue block of protocol lines for netdata.
+    :param block: str
+    """
+    _multiplexer.write(block)
+
+
+def flush():
+    """
+    Write all queued blocks to netdata.
+    """
+    _multiplexer.flush()
+
+
+def stats():
+    """
+    Output statistics: bytes and number of writes to netdata and time (in seconds) spent blocked on writing.
+    :return: dict
+    """
+    return {'bytes': _multiplexer.bytes,
+            'writes': _multiplexer.writes,
+            'blocked': _multiplexer.blocked}
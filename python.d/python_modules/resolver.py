@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Description: cached address resolution for netdata python.d modules
+
+import time
+import socket
+import threading
+
+import msg
+
+# default time (in seconds) resolved addresses are used before they are refreshed
+DNS_TTL = 60
+
+
+class Resolver(object):
+    """
+    Caches getaddrinfo() results shared by all jobs.
+    Only the first lookup of a host blocks (non-blocking collectors do it in a thread,
+    see base._resolve_nonblocking). Expired entries are still returned
+    while they are refreshed in a background thread, so collection never waits
+    for DNS. When refresh fails previous addresses are kept.
+    """
+
+    def __init__(self):
+        # {(host, port): [addresses, expires, refreshing]}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _lookup(host, port):
+        """
+        :param host: str
+        :param port: int
+        :return: list
+        """
+        return socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+
+    def _refresh(self, key, ttl):
+        """
+        Background refresh of cache entry
+        :param key: tuple
+        :param ttl: int
+        """
+        try:
+            addresses = self._lookup(*key)
+        except socket.error as e:
+            msg.debug("cannot resolve", str(key[0]) + ":", str(e), "- using cached addresses")
+            addresses = None
+        with self._lock:
+            entry = self._cache[key]
+            if addresses:
+                entry[0] = addresses
+            entry[1] = time.time() + ttl
+            entry[2] = False
+
+    def cached(self, host, port, ttl=DNS_TTL):
+        """
+        Get cached addresses of host:port without blocking. Expired ones are refreshed in background.
+        :param host: str
+        :param port: int
+        :param ttl: int
+        :return: list/None - None when host has to be resolved first
+        """
+        if ttl <= 0:
+            return None
+        key = (host, port)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time() and not entry[2]:
+                entry[2] = True
+                thread = threading.Thread(target=self._refresh, args=(key, ttl))
+                thread.daemon = True
+                thread.start()
+            return entry[0]
+
+    def resolve(self, host, port, ttl=DNS_TTL):
+        """
+        Get addresses of host:port. TTL of 0 disables caching.
+        :param host: str
+        :param port: int
+        :param ttl: int
+        :return: list
+        """
+        addresses = self.cached(host, port, ttl)
+        if addresses is not None:
+            return addresses
+        addresses = self._lookup(host, port)
+        if ttl > 0:
+            with self._lock:
+                self._cache[(host, port)] = [addresses, time.time() + ttl, False]
+        return addresses
+
+    def invalidate(self, host, port):
+        """
+        Refresh addresses of host:port on next use (ex. when none of them accepts connections)
+        :param host: str
+        :param port: int
+        """
+        with self._lock:
+            entry = self._cache.get((host, port))
+            if entry is not None:
+                entry[1] = 0
+
+
+_resolver = Resolver()
+
+
+def resolve(host, port, ttl=DNS_TTL):
+    """
+    Get (possibly cached) addresses of host:port.
+    :param host: str
+    :param port: int
+    :param ttl: int
+    :return: list
+    """
+    return _resolver.resolve(host, port, ttl)
+
+
+def cached(host, port, ttl=DNS_TTL):
+    """
+    Get cached addresses of host:port, None if it wasn't resolved yet.
+    :param host: str
+    :param port: int
+    :param ttl: int
+    :return: list/None
+    """
+    return _resolver.cached(host, port, ttl)
+
+
+def invalidate(host, port):
+    """
+    Mark cached addresses of host:port as expired.
+    :param host: str
+    :param port: int
+    """
+    _resolver.invalidate(host, port)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# Description: event loop scheduler for netdata python.d jobs
+
+import os
+import time
+import heapq
+import errno
+import socket
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import msg
+from base import EVENT_READ, Poller
+
+
+class Scheduler(object):
+    """
+    Runs every job from one loop instead of one thread per job.
+    Jobs are kept in a priority queue ordered by their next deadline.
+    When deadline passes job is handed to a small pool of worker threads
+    so blocking collectors don't stall the loop.
+    In asynchronous mode I/O of jobs supporting it (job.asynchronous) is
+    done by the loop itself and only parsing is left for workers.
+    Optional `tick` function is called by the loop every `interval` seconds.
+    """
+
+    def __init__(self, workers=4, asynchronous=False, tick=None, interval=1):
+        """
+        :param workers: int
+        :param asynchronous: boolean
+        :param tick: function
+        :param interval: float
+        """
+        self.workers = max(int(workers), 1)
+        self.asynchronous = asynchronous
+        self.tick = tick
+        self.interval = interval
+        self._next_tick = 0
+        self._heap = []
+        self._seq = 0
+        self._ready = queue.Queue()
+        self._done = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        # jobs waiting for socket events: {fileno: (job, generator, sockets, event, deadline, wake, filenos)}
+        self._waiting = {}
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        # epoll/poll, number of sockets of waiting jobs isn't limited by FD_SETSIZE
+        self._poller = Poller()
+        self._poller.register(self._wakeup_r, EVENT_READ)
+        self.active = 0
+
+    def reserve(self):
+        """
+        Announce a job which will be added later (ex. after its checks pass).
+        Scheduler doesn't exit while there are reserved jobs.
+        """
+        with self._lock:
+            self.active += 1
+
+    def release(self):
+        """
+        Cancel reservation made with reserve()
+        """
+        with self._lock:
+            self.active -= 1
+        os.write(self._wakeup_w, b".")
+
+    def add(self, job, reserved=False):
+        """
+        Register job. It will be executed as soon as possible.
+        Can be called from any thread.
+        :param job: object
+        :param reserved: boolean
+        """
+        if not reserved:
+            self.reserve()
+        job.timetable['last'] = time.time()
+        self._finished(job, time.time())
+
+    def _finished(self, job, deadline):
+        """
+        Pass job back to the loop and wake it up
+        :param job: object
+        :param deadline: float/None
+        """
+        self._done.put((job, deadline))
+        os.write(self._wakeup_w, b".")
+
+    def _worker(self):
+        """
+        Worker thread. Executes one step of every job taken from the queue
+        and reports deadline of its next run (or None when job has finished).
+        """
+        while True:
+            job = self._ready.get()
+            delay = job._run_step()
+            if delay is None:
+                self._finished(job, None)
+            else:
+                self._finished(job, time.time() + delay)
+
+    def _start_workers(self):
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _schedule(self, job, deadline):
+        """
+        Put job back into priority queue or drop it
+        :param job: object
+        :param deadline: float/None
+        """
+        if deadline is None:
+            with self._lock:
+                self.active -= 1
+            msg.debug(job.chart_name, "removed from scheduler")
+            return
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, job))
+
+    def _advance(self, job, generator, deadline, value=None, error=None):
+        """
+        Resume non-blocking data collection of a job.
+        Job is passed to workers when collection is finished.
+        :param job: object
+        :param generator: generator
+        :param deadline: float
+        :param value: socket/None - socket which became ready
+        :param error: Exception
+        """
+        try:
+            if error is None:
+                step = generator.send(value)
+            else:
+                step = generator.throw(error)
+        except StopIteration:
+            self._ready.put(job)
+            return
+        except Exception as e:
+            job.error("asynchronous collection failed:", str(e))
+            self._ready.put(job)
+            return
+        socks = step[0] if isinstance(step[0], (list, tuple)) else [step[0]]
+        wake = None
+        if len(step) > 2 and step[2] is not None:
+            wake = time.time() + step[2]
+        fds = [sock.fileno() for sock in socks]
+        waiting = (job, generator, socks, step[1], deadline, wake, fds)
+        try:
+            for fd in fds:
+                self._waiting[fd] = waiting
+                self._poller.register(fd, step[1])
+        except (KeyError, ValueError, OSError, IOError) as e:
+            self._resume(waiting, error=socket.error("cannot wait for socket: " + str(e)))
+
+    def _resume(self, waiting, value=None, error=None):
+        """
+        Stop waiting for sockets of a job and resume its collection
+        :param waiting: tuple
+        :param value: socket/None
+        :param error: Exception
+        """
+        for fd in waiting[6]:
+            if self._waiting.get(fd) is waiting:
+                del self._waiting[fd]
+                self._poller.unregister(fd)
+        self._advance(waiting[0], waiting[1], waiting[4], value, error)
+
+    def _dispatch(self, job):
+        """
+        Run job: start non-blocking collection or pass it to workers
+        :param job: object
+        """
+        if not (self.asynchronous and job.asynchronous):
+            self._ready.put(job)
+        elif job.timetable['next'] > time.time():
+            self._schedule(job, job.timetable['next'])
+        else:
+            self._advance(job, job._get_raw_data_async(), time.time() + job.timetable['freq'])
+
+    def run_once(self):
+        """
+        Executes one loop iteration: waits for finished jobs, socket events or first deadline
+        and dispatches all jobs which should be run.
+        """
+        waiting = dict((id(w), w) for w in self._waiting.values()).values()
+        deadlines = [min(w[4], w[5]) if w[5] is not None else w[4] for w in waiting]
+        if len(self._heap) > 0:
+            deadlines.append(self._heap[0][0])
+        if self.tick is not None:
+            deadlines.append(self._next_tick)
+        timeout = None
+        if len(deadlines) > 0:
+            timeout = max(min(deadlines) - time.time(), 0)
+
+        try:
+            ready = self._poller.poll(timeout)
+        except Exception as e:
+            # python2 raises select.error, which isn't OSError
+            if getattr(e, 'errno', None) == errno.EINTR or (e.args and e.args[0] == errno.EINTR):
+                ready = []
+            else:
+                msg.error("scheduler poll() failed:", str(e))
+                ready = []
+                for w in waiting:
+                    self._resume(w, error=socket.error(str(e)))
+                waiting = []
+
+        if self._wakeup_r in ready:
+            os.read(self._wakeup_r, 4096)
+            ready.remove(self._wakeup_r)
+            try:
+                while True:
+                    self._schedule(*self._done.get_nowait())
+            except queue.Empty:
+                pass
+
+        for fd in ready:
+            w = self._waiting.get(fd)
+            # other socket of the same job could have been ready too
+            if w is None:
+                continue
+            self._resume(w, w[2][w[6].index(fd)])
+
+        now = time.time()
+        for w in waiting:
+            if self._waiting.get(w[6][0]) is not w:
+                continue
+            if w[4] <= now:
+                self._resume(w, error=socket.timeout("timed out"))
+            elif w[5] is not None and w[5] <= now:
+                self._resume(w)
+
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            self._dispatch(heapq.heappop(self._heap)[2])
+
+        if self.tick is not None and self._next_tick <= now:
+            self._next_tick = now + self.interval
+            self.tick()
+
+    def run(self):
+        """
+        Runs loop until there are no more jobs.
+        """
+        self._start_workers()
+        while self.active > 0:
+            self.run_once()
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+# Description: log file follower for netdata python.d modules
+
+import io
+import os
+import json
+import hashlib
+
+import msg
+import inotify
+
+# events of directory with the log meaning that path could point to another file now
+DIRECTORY_EVENTS = inotify.IN_CREATE | inotify.IN_MOVED_TO | inotify.IN_MOVED_FROM | inotify.IN_DELETE
+# events of the log itself
+FILE_EVENTS = inotify.IN_MODIFY | inotify.IN_MOVE_SELF | inotify.IN_DELETE_SELF
+
+# size of one read
+CHUNK_SIZE = 65536
+# longer lines are cut
+MAX_LINE = 1048576
+# at most this many bytes before read position are compared to detect truncated file
+VERIFY_SIZE = 4096
+
+
+class Tail(object):
+    """
+    Follows a growing log file.
+    File is kept open and identified by (device, inode), so rotation is noticed even when
+    the new file grows past the old position. Rotated file is read to its end before
+    switching to the new one. File truncated in place (copytruncate) is read from its start.
+    With inotify the file is read only when it was modified and the path is checked
+    only when the directory changed. Without it every read checks the file (polling).
+    Data is returned in chunks of complete lines, partial last line is kept until it is finished.
+    Reading can be limited to a number of bytes, the rest is read next time.
+    """
+
+    def __init__(self, path, position=0, use_inotify=True):
+        """
+        :param path: str
+        :param position: int/None - offset to start reading at, None to start at end of file
+        :param use_inotify: boolean
+        """
+        self.path = path
+        self.position = position
+        self.file = None
+        # (st_dev, st_ino) of opened file
+        self.id = None
+        self._name = os.path.basename(path)
+        # incomplete line read at the end of file and last complete line (for checkpoints)
+        self._carry = b""
+        self._last_line = b""
+        # bytes which can be read yet during current read, None if unlimited
+        self._budget = None
+        # limit was reached before end of file or before switching to rotated file
+        self._backlog = False
+        self._rotated = False
+        self._inotify = None
+        self._dir_wd = None
+        self._file_wd = None
+        if use_inotify:
+            try:
+                self._inotify = inotify.Inotify()
+                self._dir_wd = self._inotify.add_watch(os.path.dirname(os.path.abspath(path)), DIRECTORY_EVENTS)
+            except OSError as e:
+                msg.debug("cannot watch", path, "with inotify (" + str(e) + "), polling it")
+                self.close()
+                self._inotify = None
+
+    @property
+    def polling(self):
+        return self._inotify is None
+
+    @property
+    def offset(self):
+        """
+        Offset of first byte which wasn't returned yet
+        :return: int
+        """
+        return (self.position or 0) - len(self._carry)
+
+    def _open(self, path=None):
+        """
+        Open file pointed by path
+        :param path: str - other path than followed one (ex. rotated file)
+        :return: boolean
+        """
+        path = path or self.path
+        try:
+            # io files (unlike python2 built-in ones) can read data appended after EOF was reached
+            fp = io.open(path, "rb")
+        except (IOError, OSError):
+            return False
+        stat = os.fstat(fp.fileno())
+        self.file = fp
+        self.id = (stat.st_dev, stat.st_ino)
+        self._last_line = b""
+        if self._inotify is not None:
+            try:
+                self._file_wd = self._inotify.add_watch(path, FILE_EVENTS)
+            except OSError:
+                # replaced again, directory event will follow
+                self._file_wd = None
+        if self.position is None:
+            self.position = stat.st_size
+        elif self.position > stat.st_size:
+            self.position = 0
+        fp.seek(self.position)
+        return True
+
+    def _close_file(self):
+        if self._file_wd is not None:
+            self._inotify.rm_watch(self._file_wd)
+            self._file_wd = None
+        self.file.close()
+        self.file = None
+        self.id = None
+
+    def _events(self):
+        """
+        Check what happened since last read
+        :return: tuple - (modified, path changed)
+        """
+        modified = False
+        rotated = False
+        for wd, mask, _, name in self._inotify.read():
+            if mask & inotify.IN_Q_OVERFLOW:
+                return True, True
+            if wd == self._dir_wd:
+                rotated = rotated or name == self._name
+            elif wd == self._file_wd:
+                if mask & (inotify.IN_MOVE_SELF | inotify.IN_DELETE_SELF):
+                    rotated = True
+                else:
+                    modified = True
+        return modified, rotated
+
+    def _truncated(self):
+        """
+        Check if opened file was truncated in place (copytruncate) since last read.
+        File could have grown past the old position again, so bytes before the position
+        are compared with the last line read too.
+        :return: boolean
+        """
+        if os.fstat(self.file.fileno()).st_size < self.position:
+            return True
+        expected = (self._last_line + self._carry)[-VERIFY_SIZE:]
+        if not expected:
+            return False
+        self.file.seek(self.position - len(expected))
+        data = self.file.read(len(expected))
+        self.file.seek(self.position)
+        return data != expected
+
+    def _read_chunks(self, final=False):
+        """
+        Read complete lines appended to opened file
+        :param final: boolean - return also last line without newline (file won't grow anymore)
+        :return: generator of bytes
+        """
+        while self._budget is None or self._budget > 0:
+            size = CHUNK_SIZE if self._budget is None else min(CHUNK_SIZE, self._budget)
+            data = self.file.read(size)
+            if not data:
+                if final and self._carry:
+                    chunk, self._carry = self._carry + b"\n", b""
+                    yield chunk
+                return
+            self.position += len(data)
+            if self._budget is not None:
+                self._budget -= len(data)
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                self._carry += data
+                if len(self._carry) >= MAX_LINE:
+                    # line is too long, it is cut
+                    chunk, self._carry = self._carry + b"\n", b""
+                    self._last_line = b""
+                    yield chunk
+                continue
+            if self._carry:
+                chunk, self._carry = self._carry + data[:end], data[end:]
+            else:
+                chunk, self._carry = data[:end], data[end:]
+            self._last_line = chunk[chunk.rfind(b"\n", 0, len(chunk) - 1) + 1:]
+            yield chunk
+        self._backlog = True
+
+    def seek(self, position):
+        """
+        Continue reading at position
+        :param position: int
+        """
+        self.position = position
+        self._carry = b""
+        self._last_line = b""
+        self._backlog = True
+        if self.file is not None:
+            self.file.seek(position)
+
+    def chunks(self, limit=None):
+        """
+        Get data appended since last read in chunks of complete lines
+        :param limit: int/None - maximum number of bytes read
+        :return: generator of bytes
+        """
+        if self.file is None or self._inotify is None:
+            modified = rotated = True
+        else:
+            modified, rotated = self._events()
+            modified = modified or self._backlog
+            rotated = rotated or self._rotated
+        self._budget = limit or None
+        self._backlog = False
+        self._rotated = False
+
+        if self.file is not None and modified:
+            if self._truncated():
+                msg.debug(self.path, "was truncated, reading it from start")
+                self.seek(0)
+                self._backlog = False
+            for chunk in self._read_chunks():
+                yield chunk
+
+        if not rotated:
+            return
+        if self._backlog:
+            # rotation is checked when everything before it is read
+            self._rotated = True
+            return
+        try:
+            stat = os.stat(self.path)
+            current = (stat.st_dev, stat.st_ino)
+        except OSError:
+            current = None
+        if current == self.id:
+            return
+        if self.file is not None:
+            msg.debug(self.path, "was rotated, reading rest of old file")
+            for chunk in self._read_chunks(final=True):
+                yield chunk
+            if self._backlog:
+                self._rotated = True
+                return
+            self._close_file()
+            self.position = 0
+        if current is not None and self._open():
+            for chunk in self._read_chunks():
+                yield chunk
+
+    def checkpoint(self):
+        """
+        Position of opened file which can be restored after restart
+        :return: dict/None
+        """
+        if self.file is None:
+            return None
+        return {'path': self.path,
+                'inode': self.id[1],
+                'offset': self.offset,
+                'length': len(self._last_line),
+                'hash': hashlib.md5(self._last_line).hexdigest()}
+
+    @staticmethod
+    def _verify(path, checkpoint):
+        """
+        Check if last line read before checkpoint is still in the file
+        :param path: str
+        :param checkpoint: dict
+        :return: bytes/None - the line
+        """
+        try:
+            with io.open(path, "rb") as fp:
+                fp.seek(int(checkpoint['offset']) - int(checkpoint['length']))
+                line = fp.read(int(checkpoint['length']))
+        except (IOError, OSError, KeyError, TypeError, ValueError):
+            return None
+        if hashlib.md5(line).hexdigest() != checkpoint.get('hash'):
+            return None
+        return line
+
+    def restore(self, checkpoint):
+        """
+        Continue reading where checkpoint was made.
+        File is looked up by inode, so a file rotated in the meantime is read to its end
+        before switching to the new one.
+        :param checkpoint: dict
+        :return: boolean
+        """
+        try:
+            inode = int(checkpoint['inode'])
+            offset = int(checkpoint['offset'])
+            directory = os.path.dirname(os.path.abspath(self.path))
+            candidates = [self.path] + sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                                              if name.startswith(self._name) and name != self._name)
+        except (KeyError, TypeError, ValueError, OSError):
+            return False
+        for path in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_ino != inode:
+                continue
+            line = self._verify(path, checkpoint) if stat.st_size >= offset else None
+            if line is None:
+                return False
+            if self.file is not None:
+                self._close_file()
+            self.position = offset
+            self._carry = b""
+            if not self._open(path):
+                return False
+            self._last_line = line
+            if path != self.path:
+                msg.debug(self.path, "was rotated to", path, "since checkpoint")
+                self._rotated = True
+            self._backlog = True
+            return True
+        return False
+
+    def close(self):
+        if self.file is not None:
+            self._close_file()
+        if self._inotify is not None:
+            self._inotify.close()
+
+
+def load_checkpoint(path):
+    """
+    Read checkpoint saved with save_checkpoint()
+    :param path: str
+    :return: dict/None
+    """
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Atomically replace checkpoint file
+    :param path: str
+    :param checkpoint: dict
+    """
+    temporary = path + ".tmp"
+    with open(temporary, "w") as fp:
+        json.dump(checkpoint, fp)
+    os.rename(temporary, path)
@@ -2,7 +2,9 @@
 # Description: redis netdata python.d module
 # Author: Pawel Krupa (paulfantom)
 
+import re
 from base import SocketService
+from framing import RESPFramer, RESPError
 
 # default module values (can be overridden per job in `config`)
 #update_every = 2
@@ -16,10 +18,25 @@ retries = 60
 #             'priority': priority,
 #             'host': 'localhost',
 #             'port': 6379,
-#             'unix_socket': None
+#             'unix_socket': None,
+#             'pass': None,
+#             'commands_top': 20
 #          }}
 
-ORDER = ['operations', 'hit_rate', 'memory', 'keys', 'clients', 'slaves']
+# INFO sections requested in every pipeline (only one section can be requested per command)
+INFO_SECTIONS = ['clients', 'memory', 'stats', 'replication', 'keyspace', 'commandstats']
+
+# commands sent in one round trip after INFO sections
+COMMANDS = [['CONFIG', 'GET', 'maxmemory'], ['SLOWLOG', 'LEN'], ['DBSIZE'], ['LATENCY', 'LATEST']]
+
+# maximum number of commands charted by default
+COMMANDS_TOP = 20
+
+# cmdstat_<command>:calls=<calls>,usec=<usec>,usec_per_call=<avg>
+CMDSTAT = re.compile(r"^cmdstat_([^:]+):calls=(\d+),usec=(\d+)", re.M)
+
+ORDER = ['operations', 'hit_rate', 'memory', 'keys', 'clients', 'slaves', 'slowlog', 'latency',
+         'commands_calls', 'commands_usec']
 
 CHARTS = {
     'operations': {
@@ -36,13 +53,13 @@ CHARTS = {
         'options': [None, 'Memory utilization', 'kilobytes', 'Memory', 'redis.memory', 'line'],
         'lines': [
             ['used_memory', 'total', 'absolute', 1, 1024],
-            ['used_memory_lua', 'lua', 'absolute', 1, 1024]
+            ['used_memory_lua', 'lua', 'absolute', 1, 1024],
+            ['maxmemory', 'max', 'absolute', 1, 1024]
         ]},
     'keys': {
         'options': [None, 'Database keys', 'keys', 'Keys', 'redis.keys', 'line'],
-        'lines': [
-            # lines are created dynamically in `check()` method
-        ]},
+        'lines': [],
+        'dynamic': {'match': r'^db\d+$'}},
     'clients': {
         'options': [None, 'Clients', 'clients', 'Clients', 'redis.clients', 'line'],
         'lines': [
@@ -53,88 +70,180 @@ CHARTS = {
         'options': [None, 'Slaves', 'slaves', 'Replication', 'redis.replication', 'line'],
         'lines': [
             ['connected_slaves', 'connected', 'absolute']
-        ]}
+        ]},
+    'slowlog': {
+        'options': [None, 'Slow log', 'entries', 'Statistics', 'redis.slowlog', 'line'],
+        'lines': [
+            ['slowlog_len', 'entries', 'absolute']
+        ]},
+    'latency': {
+        'options': [None, 'Latency', 'milliseconds', 'Statistics', 'redis.latency', 'line'],
+        'lines': [
+            ['round_trip', 'round trip', 'absolute', 1, 1000],
+            ['latency_latest', 'latest event', 'absolute']
+        ]},
+    'commands_calls': {
+        'options': [None, 'Calls per command', 'calls/s', 'Commands', 'redis.commands_calls', 'stacked'],
+        'lines': [],
+        'dynamic': {'match': r'^cmd_(.+)_calls$', 'algorithm': 'incremental', 'limit': COMMANDS_TOP}},
+    'commands_usec': {
+        'options': [None, 'Average time per call', 'usec/call', 'Commands', 'redis.commands_usec', 'line'],
+        'lines': [],
+        # the same (most called) commands as in commands_calls chart
+        'dynamic': {'match': r'^cmd_(.+)_calls$', 'id': 'cmd_{0}_usec', 'limit': COMMANDS_TOP}}
 }
 
 
 class Service(SocketService):
     def __init__(self, configuration=None, name=None):
         SocketService.__init__(self, configuration=configuration, name=name)
-        self.request = "INFO\r\n"
+        self.request = ""
         self.host = "localhost"
         self.port = 6379
         self.unix_socket = None
         self.order = ORDER
         self.definitions = CHARTS
         self._keep_alive = True
+        self._framer = RESPFramer()
+        self.password = None
+        self.commands_top = COMMANDS_TOP
+        # previous (calls, usec) of every command
+        self._commandstats = {}
         self.chart_name = ""
 
+    @staticmethod
+    def _command(*args):
+        """
+        Encode command as RESP array of bulk strings
+        :param args: str
+        :return: str
+        """
+        encoded = "*" + str(len(args)) + "\r\n"
+        for arg in args:
+            encoded += "$" + str(len(arg.encode('utf-8'))) + "\r\n" + arg + "\r\n"
+        return encoded
+
+    def _build_request(self):
+        """
+        Pipeline all commands (with authentication if needed) into one request
+        """
+        commands = [["INFO", section] for section in INFO_SECTIONS] + COMMANDS
+        if self.password is not None:
+            commands.insert(0, ["AUTH", self.password])
+        self.request = "".join(self._command(*command) for command in commands).encode()
+        self._framer.expected = len(commands)
+
     def _get_data(self):
         """
         Get data from socket
         :return: dict
         """
-        try:
-            raw = self._get_raw_data().split("\n")
-        except AttributeError:
+        if self._get_raw_data() is None:
             self.error("no data received")
             return None
+        replies = self._framer.replies
+        if self._framer.invalid or len(replies) < self._framer.expected:
+            self.error("incomplete or invalid response received")
+            self._disconnect()
+            return None
+        if self.password is not None:
+            if isinstance(replies[0], RESPError):
+                self.error("authentication failed:", str(replies[0]))
+                self._disconnect()
+                return None
+            replies = replies[1:]
+
         data = {}
-        for line in raw:
-            if line.startswith(('instantaneous', 'keyspace', 'used_memory', 'connected', 'blocked')):
-                try:
-                    t = line.split(':')
-                    data[t[0]] = int(t[1])
-                except (IndexError, ValueError):
-                    pass
-            elif line.startswith('db'):
-                tmp = line.split(',')[0].replace('keys=', '')
-                record = tmp.split(':')
-                data[record[0]] = int(record[1])
+        for info in replies[:len(INFO_SECTIONS)]:
+            if isinstance(info, RESPError):
+                self.debug("INFO failed:", str(info))
+                continue
+            if info.startswith("# Commandstats"):
+                self._parse_commandstats(info, data)
+                continue
+            for line in info.split("\n"):
+                if line.startswith(('instantaneous', 'keyspace', 'used_memory', 'connected', 'blocked')):
+                    try:
+                        t = line.split(':')
+                        data[t[0]] = int(t[1])
+                    except (IndexError, ValueError):
+                        pass
+                elif line.startswith('db'):
+                    tmp = line.split(',')[0].replace('keys=', '')
+                    record = tmp.split(':')
+                    data[record[0]] = int(record[1])
         try:
             data['hit_rate'] = int((data['keyspace_hits'] / float(data['keyspace_hits'] + data['keyspace_misses'])) * 100)
         except:
             data['hit_rate'] = 0
 
+        maxmemory, slowlog, dbsize, latency = replies[len(INFO_SECTIONS):]
+        # commands can be unsupported by older servers or renamed
+        if isinstance(maxmemory, list) and len(maxmemory) == 2:
+            try:
+                data['maxmemory'] = int(maxmemory[1])
+            except (TypeError, ValueError):
+                pass
+        if isinstance(slowlog, int):
+            data['slowlog_len'] = slowlog
+        if isinstance(dbsize, int):
+            # empty databases are not listed in keyspace section
+            data.setdefault('db0', dbsize)
+        if isinstance(latency, list):
+            # [event, timestamp, latest, max] for every event
+            data['latency_latest'] = max([event[2] for event in latency] or [0])
+        if self.round_trip is not None:
+            data['round_trip'] = int(self.round_trip * 1000000)
+
         if len(data) == 0:
             self.error("received data doesn't have needed records")
             return None
         else:
             return data
 
-    def _check_raw_data(self, data):
+    def _parse_commandstats(self, info, data):
         """
-        Check if all data has been gathered from socket.
-        Parse first line containing message length and check against received message
-        :param data: str
-        :return: boolean
+        Parse INFO commandstats section into calls and average time per call of every command
+        since previous collection
+        :param info: str
+        :param data: dict
         """
-        length = len(data)
-        supposed = data.split('\n')[0][1:]
-        offset = len(supposed) + 4  # 1 dollar sing, 1 new line character + 1 ending sequence '\r\n'
-        supposed = int(supposed)
-        if length - offset >= supposed:
-            return True
-        else:
-            return False
-
-        return False
+        previous = self._commandstats
+        current = {}
+        for command, calls, usec in CMDSTAT.findall(info):
+            calls = int(calls)
+            usec = int(usec)
+            current[command] = (calls, usec)
+            data['cmd_' + command + '_calls'] = calls
+            try:
+                calls_before, usec_before = previous[command]
+                data['cmd_' + command + '_usec'] = (usec - usec_before) // (calls - calls_before)
+            except (KeyError, ZeroDivisionError):
+                data['cmd_' + command + '_usec'] = 0
+        self._commandstats = current
 
     def check(self):
         """
-        Parse configuration, check if redis is available, and dynamically create chart lines data
+        Parse configuration and check if redis is available
         :return: boolean
         """
         self._parse_config()
         if self.name == "":
             self.name = "local"
             self.chart_name += "_" + self.name
-        data = self._get_data()
-        if data is None:
+        try:
+            self.password = str(self.configuration['pass'])
+        except (KeyError, TypeError):
+            pass
+        try:
+            self.commands_top = int(self.configuration['commands_top'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        if self.commands_top != COMMANDS_TOP:
+            for chart in ('commands_calls', 'commands_usec'):
+                self.overlay[chart] = {'dynamic': dict(CHARTS[chart]['dynamic'], limit=self.commands_top)}
+        self._build_request()
+        if self._get_data() is None:
             return False
 
-        for name in data:
-            if name.startswith('db'):
-                self.definitions['keys']['lines'].append([name, None, 'absolute'])
-
         return True
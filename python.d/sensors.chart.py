@@ -56,6 +56,7 @@ class Service(SimpleService):
         self.order = []
         self.definitions = {}
         self.chips = []
+        self.types = ORDER
 
     def _get_data(self):
         data = {}
@@ -74,7 +75,7 @@ class Service(SimpleService):
         return data
 
     def _create_definitions(self):
-        for type in ORDER:
+        for type in self.types:
             for chip in sensors.iter_detected_chips():
                 prefix = '_'.join(str(chip.path.decode()).split('/')[3:])
                 name = ""
@@ -108,8 +109,7 @@ class Service(SimpleService):
         except (KeyError, TypeError):
             self.error("No path to log specified. Using all chips.")
         try:
-            global ORDER
-            ORDER = list(self.configuration['types'])
+            self.types = list(self.configuration['types'])
         except (KeyError, TypeError):
             self.error("No path to log specified. Using all sensor types.")
         try:
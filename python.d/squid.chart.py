@@ -3,6 +3,7 @@
 # Author: Pawel Krupa (paulfantom)
 
 from base import SocketService
+from framing import HTTPFramer
 import select
 
 # default module values (can be overridden per job in `config`)
@@ -47,6 +48,7 @@ class Service(SocketService):
     def __init__(self, configuration=None, name=None):
         SocketService.__init__(self, configuration=configuration, name=name)
         self._keep_alive = True
+        self._framer = HTTPFramer()
         self.request = ""
         self.host = "localhost"
         self.port = 3128
@@ -82,17 +84,6 @@ class Service(SocketService):
         else:
             return data
 
-    def _check_raw_data(self, data):
-        if "Connection: keep-alive" in data[:1024]:
-            self._keep_alive = True
-        else:
-            self._keep_alive = False
-
-        if data[-7:] == "\r\n0\r\n\r\n" and "Transfer-Encoding: chunked" in data[:1024]:  # HTTP/1.1 response
-            return True
-        else:
-            return False
-
     def check(self):
         """
         Parse essential configuration, autodetect squid configuration (if needed), and check if data is available
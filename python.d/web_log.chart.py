@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# Description: web server access log netdata python.d module
+
+import re
+from base import LogService
+from sketch import Sketch
+
+priority = 60000
+retries = 60
+# update_every = 3
+
+# default job configuration (overridden by python.d.plugin)
+# config = {'nginx': {
+#             'update_every': update_every,
+#             'retries': retries,
+#             'priority': priority,
+#             'path': '/var/log/nginx/access.log',
+#             'format': 'auto'
+#          }}
+
+# common part of apache and nginx access log formats
+_COMMON = br'^\S+ \S+ \S+ \[[^]\n]*\] "(?P<method>[A-Z]+) [^"\n]*" (?P<code>\d{3}) (?P<bytes>\d+|-)'
+_COMBINED = _COMMON + br' "[^"\n]*" "[^"\n]*"'
+
+# supported formats: name: (regex, multiplier of response time to microseconds)
+# every regex has `method`, `code` and `bytes` groups, response time is in optional `time` group
+FORMATS = {
+    # nginx: combined + $request_time (seconds with milliseconds)
+    'nginx_time': (_COMBINED + br' (?P<time>\d+\.\d+)[ \t]*$', 1000000),
+    # apache: combined + %D (microseconds)
+    'apache_time': (_COMBINED + br' (?P<time>\d+)[ \t]*$', 1),
+    'combined': (_COMBINED, 1),
+    'common': (_COMMON, 1),
+}
+# formats tried when `format` is 'auto', more specific first
+AUTO_FORMATS = ['nginx_time', 'apache_time', 'combined', 'common']
+
+# multipliers of `time_unit` of custom format to microseconds
+TIME_UNITS = {'s': 1000000, 'ms': 1000, 'us': 1}
+
+PERCENTILES = [50, 90, 99]
+
+STATUSES = ['1xx', '2xx', '3xx', '4xx', '5xx', 'other']
+
+# maximum number of request methods charted (anything looking like a method is accepted by servers)
+METHODS_TOP = 15
+
+ORDER = ['response_statuses', 'response_codes', 'bandwidth', 'response_time', 'requests_per_method']
+
+CHARTS = {
+    'response_statuses': {
+        'options': [None, 'Response Statuses', 'requests/s', 'responses', 'web_log.response_statuses', 'stacked'],
+        'lines': [
+            ['2xx', '2xx', 'incremental'],
+            ['5xx', '5xx', 'incremental'],
+            ['3xx', '3xx', 'incremental'],
+            ['4xx', '4xx', 'incremental'],
+            ['1xx', '1xx', 'incremental'],
+            ['other', 'other', 'incremental'],
+            ['unmatched', 'unmatched', 'incremental']
+        ]},
+    'response_codes': {
+        'options': [None, 'Response Codes', 'requests/s', 'responses', 'web_log.response_codes', 'stacked'],
+        'lines': [],
+        'dynamic': {'match': r'^code_(\d{3})$', 'algorithm': 'incremental'}},
+    'bandwidth': {
+        'options': [None, 'Bandwidth', 'kilobits/s', 'bandwidth', 'web_log.bandwidth', 'area'],
+        'lines': [
+            ['bytes_sent', 'sent', 'incremental', -8, 1000]
+        ]},
+    'response_time': {
+        'options': [None, 'Response Time', 'milliseconds', 'timings', 'web_log.response_time', 'line'],
+        'lines': [
+            ['time_max', 'max', 'absolute', 1, 1000],
+            ['time_p99', 'p99', 'absolute', 1, 1000],
+            ['time_p90', 'p90', 'absolute', 1, 1000],
+            ['time_p50', 'p50', 'absolute', 1, 1000],
+            ['time_avg', 'avg', 'absolute', 1, 1000]
+        ]},
+    'requests_per_method': {
+        'options': [None, 'Requests Per HTTP Method', 'requests/s', 'http methods', 'web_log.requests_per_method',
+                    'stacked'],
+        'lines': [],
+        'dynamic': {'match': r'^method_([A-Z]+)$', 'algorithm': 'incremental', 'limit': METHODS_TOP}}
+}
+
+
+class Service(LogService):
+    def __init__(self, configuration=None, name=None):
+        LogService.__init__(self, configuration=configuration, name=name)
+        if len(self.log_path) == 0:
+            self.log_path = "/var/log/nginx/access.log"
+        self.order = ORDER
+        self.definitions = CHARTS
+        # compiled format and positions of its groups, detected from log when format is 'auto'
+        self.format = None
+        self.regex = None
+        self.time_multiplier = 1
+        self._groups = None
+        # cumulative counters: {code: requests}, {method: requests}
+        self.codes = {}
+        self.methods = {}
+        self.unmatched = 0
+        self.bytes_sent = 0
+        # response times (in microseconds) of requests logged since last update
+        self.times = Sketch()
+
+    def _set_format(self, name, regex, multiplier):
+        """
+        Use log format
+        :param name: str
+        :param regex: compiled regex
+        :param multiplier: int
+        :return: boolean
+        """
+        groups = regex.groupindex
+        if not all(group in groups for group in ('method', 'code', 'bytes')):
+            self.error("log format needs 'method', 'code' and 'bytes' groups")
+            return False
+        self.format = name
+        self.regex = regex
+        self.time_multiplier = multiplier
+        self._groups = (groups['method'] - 1, groups['code'] - 1, groups['bytes'] - 1,
+                        groups['time'] - 1 if 'time' in groups else None)
+        return True
+
+    def _detect_format(self, chunk):
+        """
+        Choose format matching most lines of log
+        :param chunk: bytes
+        :return: boolean
+        """
+        best = 0
+        for name in AUTO_FORMATS:
+            regex = re.compile(FORMATS[name][0], re.M)
+            matched = len(regex.findall(chunk))
+            if matched > best:
+                best = matched
+                self._set_format(name, regex, FORMATS[name][1])
+        if self.regex is None:
+            return False
+        self.info("detected log format:", self.format)
+        return True
+
+    def _parse(self, chunk):
+        """
+        Count requests found in chunk of log lines
+        :param chunk: bytes
+        :return: int - matched lines
+        """
+        codes = self.codes
+        methods = self.methods
+        i_method, i_code, i_bytes, i_time = self._groups
+        multiplier = self.time_multiplier
+        times = []
+        sent = 0
+        rows = self.regex.findall(chunk)
+        for row in rows:
+            code = row[i_code]
+            codes[code] = codes.get(code, 0) + 1
+            method = row[i_method]
+            methods[method] = methods.get(method, 0) + 1
+            size = row[i_bytes]
+            if size != b"-":
+                sent += int(size)
+            if i_time is not None:
+                times.append(int(float(row[i_time]) * multiplier))
+        self.bytes_sent += sent
+        self.times.update(times)
+        return len(rows)
+
+    def _get_data(self):
+        """
+        Parse new log lines
+        :return: dict
+        """
+        for chunk in self._get_raw_chunks():
+            lines = chunk.count(b"\n")
+            if self.regex is None and not self._detect_format(chunk):
+                self.unmatched += lines
+                continue
+            self.unmatched += lines - self._parse(chunk)
+
+        data = dict((status, 0) for status in STATUSES)
+        for code, count in self.codes.items():
+            code = code.decode()
+            data['code_' + code] = count
+            status = code[0] + 'xx'
+            if status in data:
+                data[status] += count
+            else:
+                data['other'] += count
+        for method, count in self.methods.items():
+            data['method_' + method.decode()] = count
+        data['unmatched'] = self.unmatched
+        data['bytes_sent'] = self.bytes_sent
+        data.update(self._get_percentiles(self.times, 'time_', PERCENTILES))
+        return data
+
+    def check(self):
+        """
+        Parse configuration and check if log file exists
+        :return: boolean
+        """
+        if not LogService.check(self):
+            return False
+        try:
+            name = str(self.configuration['format'])
+        except (KeyError, TypeError):
+            name = 'auto'
+
+        if 'custom_format' in self.configuration:
+            try:
+                regex = re.compile(str(self.configuration['custom_format']).encode(), re.M)
+            except re.error as e:
+                self.error("invalid custom_format:", str(e))
+                return False
+            try:
+                multiplier = TIME_UNITS[str(self.configuration.get('time_unit', 'us'))]
+            except KeyError:
+                self.error("time_unit should be one of:", ", ".join(sorted(TIME_UNITS)))
+                return False
+            return self._set_format('custom', regex, multiplier)
+        if name == 'auto':
+            return True
+        if name not in FORMATS:
+            self.error("unknown log format '" + name + "', it should be one of: auto,", ", ".join(AUTO_FORMATS))
+            return False
+        return self._set_format(name, re.compile(FORMATS[name][0], re.M), FORMATS[name][1])